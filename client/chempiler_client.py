@@ -13,28 +13,50 @@
 
 (c) 2017 The Cronin Group, University of Glasgow
 
-This module sets up a logging framework, then prompts the user to supply paths to GraphML and ChASM files.
+This module sets up a logging framework, then takes the paths to GraphML and ChASM files from the command line.
 Once the input has been verified, the Chempiler is started.
 
 For style guide used see http://xkcd.com/1513/
 """
 
-import inspect
+import atexit
 import logging
 import multiprocessing
 import os
+import queue
+import re
 import sys
 import time
+from logging.handlers import QueueHandler, QueueListener
 
 import click
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
+HERE = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.join(HERE, '..', 'platform_server'))
 
 from core.chempiler import Chempiler
 
 __all__ = ['main']
 
+# none of the formatters use the process fields, so don't collect them for every record
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """
+    Console handler that builds its "asctime ; module ; message" lines directly instead of going through the generic
+    Formatter machinery.
+    """
+    def emit(self, record):
+        try:
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+            msg = f"{timestamp},{int(record.msecs):03d} ; {record.module} ; {record.getMessage()}"
+            self.stream.write(msg + self.terminator)
+            self.flush()
+        except Exception:
+            self.handleError(record)
+
 
 @click.command()
 @click.option('-e', '--experiment-code', required=True)
@@ -57,30 +79,26 @@ def main(experiment_code, graph, command, log_folder, record_video, crash_dump,
     fh = logging.FileHandler(filename=os.path.join(log_folder, "{0}.txt".format(experiment_code)))
     fh.setLevel(logging.DEBUG)
 
-    # create console handler which logs all messages
-    ch = logging.StreamHandler()
+    # create console handler which logs all messages, it formats its own lines
+    ch = ConsoleHandler()
     ch.setLevel(logging.INFO)
 
     # create formatter and add it to the handlers
     file_formatter = logging.Formatter("%(asctime)s ; %(levelname)s ; %(module)s ; %(threadName)s ; %(message)s")
     fh.setFormatter(file_formatter)
-    console_formatter = logging.Formatter("%(asctime)s ; %(module)s ; %(message)s")
-    ch.setFormatter(console_formatter)
 
-    # add the handlers to the loggers
-    logger.addHandler(fh)
-    logger.addHandler(ch)
-
-    # record the entered parameters
-    logger.debug("User Input:\nXML file: {0}\nCommand file: {1}\nSimulation: {2}".format(graph, command, SIM))
+    # add a queue handler to the logger, the actual handlers are served by a listener thread
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    handlers = [fh, ch]
 
     # deal with video recording
     if record_video:
         from tools.vlogging import VlogHandler, RecordingSpeedFilter, recording_worker
 
-        # spawn queues
-        message_queue = multiprocessing.Queue()
-        recording_speed_queue = multiprocessing.Queue()
+        # spawn queues, bounded so a slow recording process can't make them grow indefinitely
+        message_queue = multiprocessing.Queue(maxsize=1024)
+        recording_speed_queue = multiprocessing.Queue(maxsize=1024)
 
         # create logging message handlers
         video_handler = VlogHandler(message_queue)
@@ -94,20 +112,27 @@ def main(experiment_code, graph, command, log_folder, record_video, crash_dump,
         speed_filter = RecordingSpeedFilter()
         recording_speed_handler.addFilter(speed_filter)
 
-        # attach the handlers
-        logger.addHandler(video_handler)
-        logger.addHandler(recording_speed_handler)
+        # attach the handlers, pickling the messages for the recording process then happens on the listener thread
+        handlers.extend((video_handler, recording_speed_handler))
 
-        # work out video name and path
+    # start the listener, so the command loop only ever enqueues records and never waits for disk or pipe writes
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)  # flush whatever is still queued on exit
+
+    # record the entered parameters
+    logger.debug("User Input:\nXML file: {0}\nCommand file: {1}\nSimulation: {2}".format(graph, command, simulation))
+
+    if record_video:
+        # work out video name and path, the file counter is one higher than the highest existing one
+        video_pattern = re.compile(r"^{0}_(\d+)\.avi$".format(re.escape(experiment_code)))
         i = 0
+        with os.scandir(log_folder) as entries:
+            for entry in entries:
+                match = video_pattern.match(entry.name)
+                if match:
+                    i = max(i, int(match.group(1)) + 1)
         video_path = os.path.join(log_folder, "{0}_{1}.avi".format(experiment_code, i))
-        while True:
-            # keep incrementing the file counter until you hit one that doesn't yet exist
-            if os.path.isfile(video_path):
-                i += 1
-                video_path = os.path.join(log_folder, "{0}_{1}.avi".format(experiment_code, i))
-            else:
-                break
 
         # launch recording process
         recording_process = multiprocessing.Process(target=recording_worker,
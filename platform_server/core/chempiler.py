@@ -19,21 +19,32 @@ are then passed on to the Executioner, to be executed one by one.
 For style guide used see http://xkcd.com/1513/
 """
 
-import inspect
+import atexit
 import logging
 import os
+import queue
 import sys
 import json
+import threading
+import time
+from collections import deque
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
+try:
+    import orjson  # optional, a lot faster than the standard library json encoder
+
+    def _dumps(data):
+        return orjson.dumps(data)
+except ImportError:
+    def _dumps(data):
+        return json.dumps(data).encode()
 
-from tools.parsing.ChASM_parser import parser
-from tools.chempiler_setup import Setup
-from tools.cmd_execution import Executioner
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(HERE, '..'))
 
 CRASH_DUMP = os.path.normpath(os.path.join(HERE, "..", "..", "client", "crash_dump", "crash_dump.json"))
-CRASH_DUMP_KEYS = ["current_volume"]
+CRASH_DUMP_KEYS = frozenset(["current_volume"])
+CRASH_DUMP_INTERVAL = 10  # maximum number of commands between two crash dumps
+CRASH_DUMP_PERIOD = 30  # maximum time in seconds between two crash dumps
 
 
 class Chempiler(object):
@@ -47,6 +58,11 @@ class Chempiler(object):
         command_file (str): Absolute path to the command file for the synthesis
     """
     def __init__(self, graphml_file, command_file, crash_dump=False, simulation=False):
+        # imported here so merely importing this module (e.g. for the client's --help) doesn't pull in the whole stack
+        from tools.parsing.ChASM_parser import parser
+        from tools.chempiler_setup import Setup
+        from tools.cmd_execution import Executioner
+
         init_setup = Setup(graphml_file, simulation)
 
         self.logger = logging.getLogger("main_logger")
@@ -55,18 +71,34 @@ class Chempiler(object):
         if crash_dump:
             self.rebuild_graph()
 
-        self.executioner = Executioner(self.graph, simulation)
+        # nodes whose crash dump relevant state has changed since the last dump, filled in by the Executioners
+        self._dirty_nodes = set()
+
+        self.executioner = Executioner(self.graph, simulation, dirty_nodes=self._dirty_nodes)
+
+        # crash dump bookkeeping, only nodes that hold state worth saving are dumped
+        self._dump_nodes = {node: attrs for node, attrs in self.graph.nodes(data=True)
+                            if attrs["class"] not in ("chemputer_pump", "chemputer_valve")}
+        self._dump = {}
+        self._dirty_nodes.update(self._dump_nodes)  # the first dump has to contain everything
+        self._dump_dirty_since = 0
+        self._dump_interval = CRASH_DUMP_INTERVAL
+        self._last_dump_time = time.monotonic()
+
+        # the crash dump is written by a background thread, the queue only ever holds the most recent dump
+        self._dump_q = queue.Queue(maxsize=1)
+        self._dump_fh = None  # opened on the first dump, so the previous crash dump survives until there is a new one
+        threading.Thread(target=self._dump_worker, name="crash dump writer", daemon=True).start()
 
-        with open(command_file) as f:
-            command_string = f.read()
-            self.command_queue = parser.parse(command_string, debug=False)
+        # PLY needs the whole input as a string, the lexer treats any \r as whitespace so no newline translation needed
+        with open(command_file, encoding="utf-8", newline="") as f:
+            self.command_queue = deque(parser.parse(f.read(), debug=False))
 
         self.simulation = simulation
 
         # debug logging
-        self.logger.debug("Parsing ChASM file. Command stack:")
-        for instruction in self.command_queue:
-            self.logger.debug(instruction)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Parsing ChASM file. Command stack:\n%s", "\n".join(map(str, self.command_queue)))
 
     def run_platform(self):
         """
@@ -75,33 +107,70 @@ class Chempiler(object):
         if self.simulation:
             self.logger.info('\n\n*** Starting simulated command procedure... ***\n')
         while self.command_queue:
-            cmd = self.command_queue.pop(0)
+            cmd = self.command_queue.popleft()
             self.executioner.execute(cmd)
+            self.maybe_dump_graph()
+        self.dump_graph()  # always leave an up to date crash dump behind
+        self._dump_q.join()  # and make sure it actually made it to disk
+
+    def maybe_dump_graph(self):
+        """
+        Dumps the graph if enough commands have been executed or enough time has passed since the last dump
+        """
+        self._dump_dirty_since += 1
+        if (self._dump_dirty_since >= self._dump_interval
+                or time.monotonic() - self._last_dump_time >= CRASH_DUMP_PERIOD):
             self.dump_graph()
 
     def dump_graph(self):
         """
         Gets the useful info of the graph nodes into a dict and dumps them to file
         """
-        dump = {}
-        for each_node in self.graph.nodes():
-            clean_dict = {}
-            class_node = self.graph.node[each_node]["class"]
-            if class_node == "chemputer_pump" or class_node == "chemputer_valve":
-                continue
-            for key, value in self.graph.node[each_node].items():
-                if key in CRASH_DUMP_KEYS:  # if we want to save the item
-                    clean_dict[key] = value
-
-            dump[each_node] = clean_dict
-        self.crash_dump_json(dump)
+        self._dump_dirty_since = 0
+        self._last_dump_time = time.monotonic()
+        if not self._dirty_nodes:
+            return  # nothing has changed since the last dump
+
+        # only repack the nodes that have changed
+        while self._dirty_nodes:
+            each_node = self._dirty_nodes.pop()
+            attrs = self._dump_nodes.get(each_node)
+            if attrs is not None:
+                self._dump[each_node] = {key: attrs[key] for key in CRASH_DUMP_KEYS if key in attrs}
+        dump = dict(self._dump)  # the node entries are replaced, never mutated, so a shallow copy is enough
+
+        # hand the dump over to the writer thread, replacing any dump that hasn't been written yet
+        try:
+            self._dump_q.get_nowait()
+            self._dump_q.task_done()
+        except queue.Empty:
+            pass
+        self._dump_q.put_nowait(dump)
+
+    def _dump_worker(self):
+        """
+        Writes crash dumps handed over by dump_graph to file, runs in its own daemon thread
+        """
+        while True:
+            data = self._dump_q.get()
+            try:
+                self.crash_dump_json(data)
+            except Exception:
+                self.logger.exception("Unable to write crash dump.")
+            finally:
+                self._dump_q.task_done()
 
     def crash_dump_json(self, data):
         """
         Dumps the dictionary to file
         """
-        with open(CRASH_DUMP, "w+") as f:
-            json.dump(data, f, indent=2)
+        if self._dump_fh is None:
+            self._dump_fh = open(CRASH_DUMP, "wb")
+            atexit.register(self._dump_fh.close)
+        self._dump_fh.seek(0)
+        self._dump_fh.write(_dumps(data))
+        self._dump_fh.truncate()
+        self._dump_fh.flush()
 
     def rebuild_graph(self):
         """
@@ -110,11 +179,8 @@ class Chempiler(object):
         with open(CRASH_DUMP) as f:
             graph_data = json.load(f)
 
-        for each_node in self.graph.nodes():
+        for each_node, attrs in self.graph.nodes(data=True):
             saved_node = graph_data.get(each_node)
-            if not saved_node:
+            if saved_node is None:
                 continue
-            for key in self.graph.node[each_node].keys():
-                saved_value = saved_node.get(key)
-                if saved_value:
-                    self.graph.node[each_node][key] = saved_value
+            attrs.update({key: value for key, value in saved_node.items() if key in attrs and value is not None})
@@ -11,19 +11,31 @@
 This API is intended for controlling a set of Chemputer pumps and valves over a local network.
 """
 
+import functools
+import itertools
 import logging
 import socket
-import sys
 import threading
 import time
 import re
+import selectors
+import struct
 from collections import OrderedDict
 
 import modules.pv_api.configs as cfgs
 
 """ CONSTANTS """
 TCP_PORT = 5000
-BUFFER_SIZE = 1024
+BUFFER_SIZE = 8192
+FRAME_TERMINATOR = b"\0"
+SOCKET_BUFFER_SIZE = 262144
+KEEPALIVE_IDLE = 1  # seconds without traffic before the first TCP keepalive probe is sent
+KEEPALIVE_INTERVAL = 1  # seconds between two probes
+KEEPALIVE_COUNT = 3  # number of unanswered probes before the connection is considered dead
+CONNECT_TIMEOUT = 2.0  # seconds to wait for a device to accept the connection
+CONNECT_ATTEMPTS = 5
+CONNECT_BACKOFF = 0.2  # seconds to wait after the first failed attempt, doubled after every further one
+TCP_NO_DELAY = True  # disable Nagle's algorithm so the short commands aren't held back waiting for an ACK
 
 RESPOND = "RESPOND: "
 SUCCESS = "SUCCESS"
@@ -41,39 +53,221 @@ NETWORK_CFG = "NETWORK"
 
 KEEPALIVE_COOKIE = "reset_wdt\0"
 
-ip_pattern = re.compile("(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})")
+# bit positions of the flags in the error byte reported by the devices
+ERROR_FLAGS = (
+    (1, "CONFIGURATION_ERROR"),
+    (2, "COMMUNICATION_ERROR"),
+    (3, "WATCHDOG_ERROR"),
+    (4, "MOTOR_STALL_ERROR"),
+    (5, "ACTUATION_ERROR"),
+    (6, "SHUTDOWN_ERROR"),
+    (7, "UNDEFINED_ERROR"),
+)
+# names of the set flags for every possible error byte
+ERROR_TABLE = tuple(
+    tuple(name for bit, name in ERROR_FLAGS if error_byte & (1 << bit)) for error_byte in range(256))
+
+# finds a tag anywhere in a response (e.g. after RESPOND) and captures whatever follows it
+response_pattern = re.compile(
+    b"("
+    + b"|".join(re.escape(tag.strip().encode()) for tag in (
+        READ_PUMP_CFG, READ_VALVE_CFG, READ_NETWORK_CFG, ERRORS, ADC, STALL, SUCCESS, FAILURE, DONE))
+    + b") ?(.*)", re.S)
 
 # debug setting
 # logging.basicConfig(level=logging.DEBUG, format="%(asctime)s ; %(levelname)s ; %(message)s")
 
 
-def udp_keepalive(udp_host):
-    """
-    Broadcasts the UDP keepalive signal to ensure the board is still alive
+# all hosts the keepalive is broadcast to, served by a single thread
+_keepalive_hosts = set()
+_keepalive_lock = threading.Lock()
+_keepalive_thread = None
 
-    Args:
-        udp_host (Tuple): Tuple containing the IP address and port of the server e.g. (192.168.255.255, 3000)
+
+def udp_keepalive():
+    """
+    Broadcasts the UDP keepalive signal to all registered hosts to ensure the boards are still alive
     """
     udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    udp.setblocking(False)
+    cookie = KEEPALIVE_COOKIE.encode()
     print("Starting UDP keepalive broadcast...")
     while True:
-        udp.sendto(KEEPALIVE_COOKIE.encode(), udp_host)
+        with _keepalive_lock:
+            hosts = list(_keepalive_hosts)
+        for udp_host in hosts:
+            try:
+                udp.sendto(cookie, udp_host)
+            except BlockingIOError:
+                pass  # send buffer full, the next round is only half a second away
         time.sleep(0.5)
 
 
 # TODO: Maybe keep the port constant so they only need to provide address and build tuple from that.
 def initialise_udp_keepalive(udp_host):
     """
-    Starts a thread for the UDP keepalive broadcast to the server
+    Adds a host to the UDP keepalive broadcast, starting the broadcast thread if it isn't running yet
 
     Args:
         udp_host (Tuple): Tuple containing the IP address and host port of the server.
     """
+    global _keepalive_thread
     if not isinstance(udp_host, tuple):
         print("Failed to launch UDP Keepalive thread.\nParameter is not tuple")
     else:
-        udp_thread = threading.Thread(target=udp_keepalive, args=(udp_host,), name="Keepalive thread for subnet {0}".format(udp_host[0]))
-        udp_thread.start()
+        with _keepalive_lock:
+            _keepalive_hosts.add(udp_host)
+            if _keepalive_thread is None:
+                _keepalive_thread = threading.Thread(target=udp_keepalive, name="UDP keepalive thread", daemon=True)
+                _keepalive_thread.start()
+
+
+# the responses of all devices are received by a single thread waiting on all their sockets at once
+_selector = selectors.DefaultSelector()
+_selector_lock = threading.Lock()
+_selector_thread = None
+SELECT_TIMEOUT = 0.5  # also bounds the time until a newly registered socket is picked up on Windows
+
+
+def response_reactor():
+    """
+    Waits for any device socket to become readable and lets the respective device read from it.
+    """
+    logger = logging.getLogger("main_logger.pv_logger")
+    while True:
+        if not _selector.get_map():
+            time.sleep(SELECT_TIMEOUT)  # select() fails on Windows if there is nothing to wait for
+            continue
+        for key, _ in _selector.select(SELECT_TIMEOUT):
+            try:
+                key.data.on_readable()
+            except Exception:
+                logger.exception("Unable to handle the response of device {0}.".format(key.data.name))
+
+
+def register_device(device):
+    """
+    Registers the socket of a device with the response reactor, starting the reactor thread if it isn't running yet
+
+    Args:
+        device (ChemputerDevice): The device, its on_readable method is called whenever there is data to receive
+    """
+    global _selector_thread
+    with _selector_lock:
+        _selector.register(device.tcp, selectors.EVENT_READ, device)
+        if _selector_thread is None:
+            _selector_thread = threading.Thread(target=response_reactor, name="Chemputer device TCP thread", daemon=True)
+            _selector_thread.start()
+
+
+def unregister_device(device):
+    """
+    Removes the socket of a device from the response reactor
+
+    Args:
+        device (ChemputerDevice): The device to remove
+    """
+    with _selector_lock:
+        try:
+            _selector.unregister(device.tcp)
+        except (KeyError, ValueError):
+            pass  # never registered or already closed
+
+
+@functools.lru_cache(maxsize=64)
+def _split_network_address(address, split_delimiter):
+    """
+    Splits a network address for convert_network_address_to_list, converting MAC segments from hex to decimal.
+
+    Args:
+        address (str): Address to convert
+        split_delimiter (str): Delimiting character used to split the address
+
+    Returns:
+        addr_split (tuple): The values of the address as strings
+    """
+    addr_split = address.split(split_delimiter)
+    if split_delimiter == ":":  # MAC segments are hex and need converting to decimal
+        return tuple(str(int(val, 16)) for val in addr_split)
+
+    return tuple(addr_split)
+
+
+@functools.lru_cache(maxsize=32)
+def _build_pump_config(config_items):
+    """
+    Builds the ordered pump configuration for construct_pump_config.
+
+    Args:
+        config_items (tuple): Sorted (key, value) pairs of the human-readable pump configuration
+
+    Returns:
+        PUMP_CONFIG (ordereddict): ordered dictionary ready to be sent to the pump
+    """
+    config_dict = dict(config_items)
+    special_items = {}
+
+    # first, figure out all the "special" items
+    try:
+        special_items["microsteps"] = cfgs.MICROSTEP_MAP[config_dict["microsteps"]]
+        special_items["motor_profile"] = cfgs.MOTOR_PROFILE_MAP[config_dict["motor_profile"]]
+        special_items["steps_per_ml"] = int((360 / cfgs.ANGLE_PER_STEP) * config_dict["microsteps"] * (
+            cfgs.SYRINGE_VOL_TO_MM[config_dict["syringe_size"]] / cfgs.THREAD_PITCH))
+        special_items["syringe_volume_steps"] = int(special_items["steps_per_ml"] * config_dict["syringe_size"])
+    except KeyError:
+        print("error")  # TODO log that
+
+    # then build the config in the right order, just transferring over the rest (int() casts booleans to integers)
+    PUMP_CONFIG = OrderedDict()
+    for item in cfgs.PUMP_CONFIG_ITEMS:
+        PUMP_CONFIG[item] = special_items[item] if item in special_items else int(config_dict[item])
+
+    # make sure every value fits its field on the device, a single pack checks them all at once
+    try:
+        cfgs.PUMP_CONFIG_STRUCT.pack(*PUMP_CONFIG.values())
+    except struct.error as e:
+        raise ValueError("Invalid pump configuration {0}: {1}".format(dict(PUMP_CONFIG), e))
+
+    return PUMP_CONFIG
+
+
+@functools.lru_cache(maxsize=32)
+def _build_valve_config(config_items):
+    """
+    Builds the ordered valve configuration for construct_valve_config.
+
+    Args:
+        config_items (tuple): Sorted (key, value) pairs of the human-readable valve configuration
+
+    Returns:
+        VALVE_CONFIG (ordereddict): ordered dictionary ready to be sent to the valve
+    """
+    config_dict = dict(config_items)
+    special_items = {}
+
+    # first, figure out all the "special" items
+    try:
+        special_items["microsteps"] = cfgs.MICROSTEP_MAP[config_dict["microsteps"]]
+        special_items["motor_profile"] = cfgs.MOTOR_PROFILE_MAP[config_dict["motor_profile"]]
+        special_items["full_revolution"] = int((360 / cfgs.ANGLE_PER_STEP) * config_dict["microsteps"])
+        special_items["clearing_distance"] = int(
+            special_items["full_revolution"] / (2 * config_dict["number_of_positions"]))
+    except KeyError:
+        print("error")  # TODO log that
+
+    # then build the config in the right order, just transferring over the rest (int() casts booleans to integers)
+    VALVE_CONFIG = OrderedDict()
+    for item in cfgs.VALVE_CONFIG_ITEMS:
+        VALVE_CONFIG[item] = special_items[item] if item in special_items else int(config_dict[item])
+
+    # make sure every value fits its field on the device, a single pack checks them all at once
+    try:
+        cfgs.VALVE_CONFIG_STRUCT.pack(*VALVE_CONFIG.values())
+    except struct.error as e:
+        raise ValueError("Invalid valve configuration {0}: {1}".format(dict(VALVE_CONFIG), e))
+
+    return VALVE_CONFIG
 
 
 class ChemputerDevice(object):
@@ -84,9 +278,32 @@ class ChemputerDevice(object):
         address (str): Address of the device
         name (str): Optional name of the device
     """
-    def __init__(self, address, name=""):
+
+    # COMMAND STRINGS, stored encoded so they can go straight into the command buffer
+    # common
+    READ_CONFIG = b"read_config"
+    WRITE_CONFIG = b"write_config"
+    READ_NETWORK_CONFIG = b"read_netcfg"
+    WRITE_NETWORK_CONFIG = b"write_netcfg"
+    READ_ERRORS = b"read_errors"
+    CLEAR_ERRORS = b"clear_errors"
+    READ_ADC = b"read_ADC"
+
+    # pump
+    MOVE_ABSOLUTE = b"move_abs"     # param: speed in uL/min, position in uL (both integers)
+    MOVE_RELATIVE = b"move_rel"     # param: speed in uL/min, volume in uL (both integers)
+    MOVE_PUMP_HOME = b"move_home"   # param: speed in uL/min (integer)
+    HARD_HOME = b"hard_home"        # param: speed in uL/min (integer)
+
+    # valve
+    AUTO_CONFIG = b"cfg"
+    MOVE_VALVE_HOME = b"home"
+    MOVE_TO_POSITION = b"pos"
+
+    def __init__(self, address, name="", no_delay=TCP_NO_DELAY):
         self.name = name
         self.address = str(address)
+        self.no_delay = no_delay
         self.device_cfg = {}
         self.network_cfg = {}
         self.device_ready_flag = threading.Event()
@@ -95,183 +312,205 @@ class ChemputerDevice(object):
 
         self.logger = logging.getLogger("main_logger.pv_logger")
 
-        self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        # response tags as matched by response_pattern, mapped to their handlers
+        self._response_handlers = {
+            READ_PUMP_CFG.strip().encode(): self._handle_pump_cfg,
+            READ_VALVE_CFG.strip().encode(): self._handle_valve_cfg,
+            READ_NETWORK_CFG.strip().encode(): self._handle_network_cfg,
+            ERRORS.strip().encode(): self._handle_errors,
+            ADC.strip().encode(): self._handle_adc,
+            STALL.encode(): self._handle_stall,
+            SUCCESS.encode(): self._handle_success,
+            FAILURE.encode(): self._handle_failure,
+            DONE.encode(): self._handle_done,
+        }
+
         self.connect_to_server()
 
-        self.tcp_response_thread = threading.Thread(target=self.receive_response, name="{0} TCP thread".format(name))
-        self.tcp_response_thread.start()
-
-        """ COMMAND STRINGS """
-        # common
-        self.READ_CONFIG = "read_config"
-        self.WRITE_CONFIG = "write_config"
-        self.READ_NETWORK_CONFIG = "read_netcfg"
-        self.WRITE_NETWORK_CONFIG = "write_netcfg"
-        self.READ_ERRORS = "read_errors"
-        self.CLEAR_ERRORS = "clear_errors"
-        self.READ_ADC = "read_ADC"
-
-        # pump
-        self.MOVE_ABSOLUTE = "move_abs"     # param: speed in uL/min, position in uL (both integers)
-        self.MOVE_RELATIVE = "move_rel"     # param: speed in uL/min, volume in uL (both integers)
-        self.MOVE_PUMP_HOME = "move_home"   # param: speed in uL/min (integer)
-        self.HARD_HOME = "hard_home"        # param: speed in uL/min (integer)
-
-        # valve
-        self.AUTO_CONFIG = "cfg"
-        self.MOVE_VALVE_HOME = "home"
-        self.MOVE_TO_POSITION = "pos"
+        self.rx_buffer = bytearray()
+        self.recv_view = memoryview(bytearray(BUFFER_SIZE))  # reused for every recv, nothing is allocated per call
+        register_device(self)
 
         """ Default configs """
         self.DEFAULT_PUMP_CONFIG = cfgs.DEFAULT_PUMP_CONFIG
         self.DEFAULT_VALVE_CONFIG = cfgs.DEFAULT_VALVE_CONFIG
         self.DEFAULT_NETWORK_CONFIG = cfgs.DEFAULT_NETWORK_CONFIG
 
-    def __del__(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
         """
-        Destructor that closes the server connection and joins the listening thread
+        Stops listening for responses and closes the server connection
         """
-        self.tcp.close()
+        unregister_device(self)
         try:
-            self.tcp_response_thread.join()
-        except AttributeError:
-            pass
+            self.tcp.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass  # already disconnected
+        self.tcp.close()
 
     def connect_to_server(self):
         """
-        Attempts to connect to the TCP server.
+        Attempts to connect to the TCP server, retrying with an increasing delay if the device doesn't respond.
 
         Raises:
-            Exception (OSException): The connection has failed.
+            ConnectionError: The device has not responded to any of the connection attempts.
         """
-        try:
-            self.tcp.connect((self.address, TCP_PORT))
-            # self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)  # turn on the TCP keepalive
-            # self.tcp.ioctl(socket.SIO_KEEPALIVE_VALS, (1, 1000, 1000))  # configure to send a keepalive packet every second
-        except Exception:
-            self.logger.exception("Unable to connect to host device: IP {0} did not respond.".format(self.address))
-            sys.exit(1)
-
-    def receive_response(self):
-        """
-        Received the response from the server and prints out the response to screen.
-        Specific cases are present for reading configurations (device/network) and for checking the completion flag.
-        """
-        while True:
+        for attempt in range(CONNECT_ATTEMPTS):
+            tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             try:
-                response = self.tcp.recv(BUFFER_SIZE).decode()
-            except(TimeoutError, ConnectionResetError):
-                self.logger.exception("Device {0} has disconnected.".format(self.name))
-                break  # TODO raise disconnection error
-
-            # response = self.tcp.recv(BUFFER_SIZE).decode()
-
-            if not response:
-                continue
-
-            elif READ_PUMP_CFG in response:
-                split = response.split(READ_PUMP_CFG)
-                cfg_string = split[1]
-
-                self.device_cfg = self.parse_device_config_string(cfg_string, PUMP_CFG)
-
-                for k, v in self.device_cfg.items():
-                    self.logger.debug("{0} {1}".format(k, v))
-
-                self.device_ready_flag.set()
-                continue
-
-            elif READ_VALVE_CFG in response:
-                split = response.split(READ_VALVE_CFG)
-                cfg_string = split[1]
-
-                self.device_cfg = self.parse_device_config_string(cfg_string, VALVE_CFG)
-
-                for k, v in self.device_cfg.items():
-                    self.logger.debug("{0} {1}".format(k, v))
-
-                self.device_ready_flag.set()
-                continue
-
-            elif READ_NETWORK_CFG in response:
-                split = response.split(READ_NETWORK_CFG)
-                network_cfg_string = split[1]
-                self.network_cfg = self.parse_network_config_string(network_cfg_string)
-                for k, v in self.network_cfg.items():
-                    self.logger.debug("{0} {1}".format(k, v))
-                self.device_ready_flag.set()
-                continue
-
-            elif ERRORS in response:
-                split = response.split(ERRORS)
-                try:
-                    error_byte = int(split[1])
-                    error_list = []
-                    if error_byte & (1 << 1):
-                        error_list.append("CONFIGURATION_ERROR")
-                    if error_byte & (1 << 2):
-                        error_list.append("COMMUNICATION_ERROR")
-                    if error_byte & (1 << 3):
-                        error_list.append("WATCHDOG_ERROR")
-                    if error_byte & (1 << 4):
-                        error_list.append("MOTOR_STALL_ERROR")
-                    if error_byte & (1 << 5):
-                        error_list.append("ACTUATION_ERROR")
-                    if error_byte & (1 << 6):
-                        error_list.append("SHUTDOWN_ERROR")
-                    if error_byte & (1 << 7):
-                        error_list.append("UNDEFINED_ERROR")
-                    self.logger.debug(error_list)
-                    self.device_ready_flag.set()
-                except TypeError:
-                    self.logger.exception("Invalid response: {0}".format(split[1]))
-                continue
-
-            elif ADC in response:
-                split = response.split(ADC)
-                try:
-                    ADC_reading = int(split[1])
-                    self.logger.debug("ADC reading: {0}".format(ADC_reading))
-                    self.device_ready_flag.set()
-                except TypeError:
-                    self.logger.exception("Invalid response: {0}".format(split[1]))
-                continue
-
-            elif STALL in response:
-                self.logger.critical("Error! Device has stalled!")  # TODO maybe raise an error?
-                # TODO not sure about the ready flag. Need to think some more.
-                # self.device_ready_flag.set()
-                continue
-
-            elif SUCCESS in response:
-                self.logger.debug(response)
-
-            elif FAILURE in response:
-                self.logger.debug(response)
-                # TODO not sure about the ready flag. Need to think some more.
-                # self.device_ready_flag.set()
-                continue
-
-            elif DONE in response:
-                self.logger.debug(response)
-                self.device_ready_flag.set()
+                # the buffer sizes have to be set before connecting to be taken into account for the TCP window
+                tcp.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+                tcp.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+                tcp.settimeout(CONNECT_TIMEOUT)
+                tcp.connect((self.address, TCP_PORT))
+                break
+            except OSError:
+                tcp.close()
+                self.logger.warning("Unable to connect to host device: IP {0} did not respond (attempt {1} of {2})."
+                                    .format(self.address, attempt + 1, CONNECT_ATTEMPTS))
+                if attempt < CONNECT_ATTEMPTS - 1:
+                    time.sleep(CONNECT_BACKOFF * 2 ** attempt)
+        else:
+            raise ConnectionError("Unable to connect to host device: IP {0} did not respond.".format(self.address))
+
+        tcp.settimeout(None)  # back to blocking, moves can take minutes without any traffic
+        tcp.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.no_delay))  # send short commands immediately
+        tcp.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)  # turn on the TCP keepalive
+        if hasattr(socket, "TCP_KEEPIDLE"):  # Linux
+            tcp.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, KEEPALIVE_IDLE)
+            tcp.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+            tcp.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, KEEPALIVE_COUNT)
+        elif hasattr(socket, "SIO_KEEPALIVE_VALS"):  # Windows
+            tcp.ioctl(socket.SIO_KEEPALIVE_VALS, (1, KEEPALIVE_IDLE * 1000, KEEPALIVE_INTERVAL * 1000))
+        self.tcp = tcp
+
+    def on_readable(self):
+        """
+        Receives the responses from the server and hands every complete message to handle_response. Called by the
+        response reactor whenever there is data to receive.
+        Messages are null-terminated, the same as the commands, and TCP may split or coalesce them arbitrarily, so the
+        received data is buffered until a terminator shows up.
+        """
+        try:
+            received = self.tcp.recv_into(self.recv_view)
+        except OSError:
+            self.logger.exception("Device {0} has disconnected.".format(self.name))
+            unregister_device(self)
+            return  # TODO raise disconnection error
+
+        if not received:
+            self.logger.error("Device {0} has closed the connection.".format(self.name))
+            unregister_device(self)
+            return  # TODO raise disconnection error
+
+        rx_buffer = self.rx_buffer
+        rx_buffer += self.recv_view[:received]
+        start = 0
+        end = rx_buffer.find(FRAME_TERMINATOR)
+        while end != -1:
+            if end > start:
+                self.handle_response(bytes(rx_buffer[start:end]))
+            start = end + 1
+            end = rx_buffer.find(FRAME_TERMINATOR, start)
+        del rx_buffer[:start]  # keep only the incomplete remainder
+
+    def handle_response(self, response):
+        """
+        Handles a single response from the server by looking up the handler for its tag.
+        Only the payload following the tag is decoded, and only by the handlers that need it as a string.
 
-            else:
-                self.logger.info(response)
-                continue
+        Args:
+            response (bytes): The response, without the terminating null character
+        """
+        # usual case, the tag is the first word of the response
+        tag, _, payload = response.partition(b" ")
+        handler = self._response_handlers.get(tag)
+        if handler is None:
+            # prefixed or otherwise unusual response, fall back to looking for a tag anywhere in it
+            match = response_pattern.search(response)
+            if match is None:
+                self.logger.info(response.decode(errors="replace"))
+                return
+            tag, payload = match.groups()
+            handler = self._response_handlers[tag]
+        handler(response, payload)
+
+    def _handle_pump_cfg(self, response, payload):
+        """ Stores the pump configuration read from the device """
+        self.device_cfg = self.parse_device_config_string(payload.decode(), PUMP_CFG)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for k, v in self.device_cfg.items():
+                self.logger.debug("%s %s", k, v)
+        self.device_ready_flag.set()
+
+    def _handle_valve_cfg(self, response, payload):
+        """ Stores the valve configuration read from the device """
+        self.device_cfg = self.parse_device_config_string(payload.decode(), VALVE_CFG)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for k, v in self.device_cfg.items():
+                self.logger.debug("%s %s", k, v)
+        self.device_ready_flag.set()
+
+    def _handle_network_cfg(self, response, payload):
+        """ Stores the network configuration read from the device """
+        self.network_cfg = self.parse_network_config_string(payload.decode())
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for k, v in self.network_cfg.items():
+                self.logger.debug("%s %s", k, v)
+        self.device_ready_flag.set()
+
+    def _handle_errors(self, response, payload):
+        """ Decodes the error flags reported by the device """
+        try:
+            error_byte = int(payload)  # int() parses ASCII digits in bytes directly
+            self.logger.debug(list(ERROR_TABLE[error_byte & 0xFF]))
+            self.device_ready_flag.set()
+        except (TypeError, ValueError):
+            self.logger.exception("Invalid response: {0}".format(payload))
+
+    def _handle_adc(self, response, payload):
+        """ Logs the ADC reading reported by the device """
+        try:
+            ADC_reading = int(payload)
+            self.logger.debug("ADC reading: {0}".format(ADC_reading))
+            self.device_ready_flag.set()
+        except (TypeError, ValueError):
+            self.logger.exception("Invalid response: {0}".format(payload))
+
+    def _handle_stall(self, response, payload):
+        """ Reports a motor stall """
+        self.logger.critical("Error! Device has stalled!")  # TODO maybe raise an error?
+        # TODO not sure about the ready flag. Need to think some more.
+        # self.device_ready_flag.set()
+
+    def _handle_success(self, response, payload):
+        """ Logs a successfully accepted command """
+        self.logger.debug(response.decode(errors="replace"))
+
+    def _handle_failure(self, response, payload):
+        """ Logs a rejected command """
+        self.logger.debug(response.decode(errors="replace"))
+        # TODO not sure about the ready flag. Need to think some more.
+        # self.device_ready_flag.set()
+
+    def _handle_done(self, response, payload):
+        """ Logs a finished operation and sets the ready flag """
+        self.logger.debug(response.decode(errors="replace"))
+        self.device_ready_flag.set()
 
     def build_command(self, *cmds):
         """
-        Builds the command string from a varying list of arguments, adding a null-terminated character
+        Builds the encoded command from a varying list of arguments, adding a null-terminated character
 
         Args:
-            cmds (Variadic): List of commands to create the string.
+            cmds (Variadic): List of commands to create the command from, bytes are used as they are.
         """
-        cmd_string = ""
-        for cmd in cmds:
-            cmd_string += (str(cmd) + " ")
-
-        return cmd_string[:-1] + "\0"
+        return b" ".join(cmd if isinstance(cmd, bytes) else str(cmd).encode() for cmd in cmds) + b"\0"
 
     def send_command(self, *cmds):
         """
@@ -280,10 +519,18 @@ class ChemputerDevice(object):
         Args:
             cmds (Variadic): List of commands used to create the string.
         """
+        self.send_built_command(self.build_command(*cmds))
+
+    def send_built_command(self, cmd):
+        """
+        Sends a command previously constructed by build_command to the TCP server.
+
+        Args:
+            cmd (bytes): The encoded, null-terminated command
+        """
         self.device_ready_flag.clear()
-        cmd = self.build_command(*cmds)
         try:
-            self.tcp.send(cmd.encode())
+            self.tcp.sendall(cmd)  # send() may write only part of the command
         except ConnectionResetError:
             self.logger.exception("Device {0} has disconnected.".format(self.name))  # TODO raise connection error
 
@@ -299,15 +546,8 @@ class ChemputerDevice(object):
         Returns:
             addr_split (List): List of strings containing the values of the address minus the delimiting character
         """
-        addr_split = address.split(split_delimiter)
-        for pos, val in enumerate(addr_split):
-            if split_delimiter == ":":
-                mac_seg = int(val, 16)
-                addr_split[pos] = str(mac_seg)
-            else:
-                addr_split[pos] = val
-
-        return addr_split
+        # subnet mask, gateway and DNS server are the same for every device, so the parsed addresses are cached
+        return list(_split_network_address(address, split_delimiter))
 
     def construct_network_config_string(self, cfg_list):
         """
@@ -319,11 +559,7 @@ class ChemputerDevice(object):
         Returns:
             cfg_string (str): String containing the numbers of the addresses
         """
-        cfg_string = ""
-        for sublist in cfg_list:
-            for elem in sublist:
-                cfg_string += (elem + " ")
-        return cfg_string[:-1]
+        return " ".join(itertools.chain.from_iterable(cfg_list))
 
     def construct_network_config(self, mac_address, ip_address, subnet_mask, gateway_ip, dns_server_ip, DHCP_mode):
         """
@@ -372,32 +608,9 @@ class ChemputerDevice(object):
         """
         if not config_dict:  # TODO find out if a property can be passed as kwarg somehow
             config_dict = self.DEFAULT_PUMP_CONFIG
-        
-        PUMP_CONFIG = OrderedDict()
-
-        # first, figure out all the "special" items
-        try:
-            PUMP_CONFIG["microsteps"] = cfgs.MICROSTEP_MAP[config_dict["microsteps"]]
-            PUMP_CONFIG["motor_profile"] = cfgs.MOTOR_PROFILE_MAP[config_dict["motor_profile"]]
-            PUMP_CONFIG["steps_per_ml"] = int((360 / cfgs.ANGLE_PER_STEP) * config_dict["microsteps"] * (
-                cfgs.SYRINGE_VOL_TO_MM[config_dict["syringe_size"]] / cfgs.THREAD_PITCH))
-            PUMP_CONFIG["syringe_volume_steps"] = int(PUMP_CONFIG["steps_per_ml"] * config_dict["syringe_size"])
-        except KeyError:
-            print("error")  # TODO log that
-
-        # then, just fill up the rest
-        for item in cfgs.PUMP_CONFIG_ITEMS:
-            if item not in PUMP_CONFIG.keys():
-                PUMP_CONFIG[item] = int(config_dict[item])  # the int() function casts booleans to integers
-
-        # finally, sort the items in the right order
-        for item in cfgs.PUMP_CONFIG_ITEMS:
-            try:
-                PUMP_CONFIG.move_to_end(item)
-            except KeyError:
-                print("error")  # TODO log that
 
-        return PUMP_CONFIG
+        # the config only depends on the values passed in, so it is built once per distinct config and then copied
+        return OrderedDict(_build_pump_config(tuple(sorted(config_dict.items()))))
 
     def construct_valve_config(self, config_dict=None):
         """
@@ -412,32 +625,9 @@ class ChemputerDevice(object):
         """
         if not config_dict:
             config_dict = self.DEFAULT_VALVE_CONFIG
-        
-        VALVE_CONFIG = OrderedDict()
 
-        # first, figure out all the "special" items
-        try:
-            VALVE_CONFIG["microsteps"] = cfgs.MICROSTEP_MAP[config_dict["microsteps"]]
-            VALVE_CONFIG["motor_profile"] = cfgs.MOTOR_PROFILE_MAP[config_dict["motor_profile"]]
-            VALVE_CONFIG["full_revolution"] = int((360 / cfgs.ANGLE_PER_STEP) * config_dict["microsteps"])
-            VALVE_CONFIG["clearing_distance"] = int(
-                VALVE_CONFIG["full_revolution"] / (2 * config_dict["number_of_positions"]))
-        except KeyError:
-            print("error")  # TODO log that
-
-        # then, just fill up the rest
-        for item in cfgs.VALVE_CONFIG_ITEMS:
-            if item not in VALVE_CONFIG.keys():
-                VALVE_CONFIG[item] = int(config_dict[item])  # the int() function casts booleans to integers
-
-        # finally, sort the items in the right order
-        for item in cfgs.VALVE_CONFIG_ITEMS:
-            try:
-                VALVE_CONFIG.move_to_end(item)
-            except KeyError:
-                print("error")  # TODO log that
-
-        return VALVE_CONFIG
+        # the config only depends on the values passed in, so it is built once per distinct config and then copied
+        return OrderedDict(_build_valve_config(tuple(sorted(config_dict.items()))))
 
     def parse_device_config_string(self, cfg_string, cfg_type):
         """
@@ -476,16 +666,11 @@ class ChemputerDevice(object):
         Returns:
             network_config (OrderedDict): Ordered Dictionary containing all the network information
         """
-        cfg_split = cfg_string.split(" ")
+        # a fresh dict for every device, the default config is shared by all of them
+        network_config = OrderedDict(zip(cfgs.NETWORK_CONFIG_ITEMS, cfg_string.split(" ")))
+        network_config["dhcp_flag"] = int(network_config["dhcp_flag"])
 
-        self.DEFAULT_NETWORK_CONFIG["mac_address"] = cfg_split[0]
-        self.DEFAULT_NETWORK_CONFIG["ip_address"] = cfg_split[1]
-        self.DEFAULT_NETWORK_CONFIG["gateway_ip"] = cfg_split[2]
-        self.DEFAULT_NETWORK_CONFIG["subnet_mask"] = cfg_split[3]
-        self.DEFAULT_NETWORK_CONFIG["dns_server_ip"] = cfg_split[4]
-        self.DEFAULT_NETWORK_CONFIG["dhcp_flag"] = int(cfg_split[5])
-
-        return self.DEFAULT_NETWORK_CONFIG
+        return network_config
 
     def convert_list_to_address(self, addr_list, mac=False):
         """
@@ -508,14 +693,19 @@ class ChemputerDevice(object):
                 addr += (elem + ".")
         return addr[:-1]
 
-    def wait_until_ready(self):
+    def wait_until_ready(self, timeout=None):
         """
         Waits until the device is ready by listening for a DONE command from the server.
         This then sets the flag that the operation has completed.
+
+        Args:
+            timeout (float): Optional maximum time to wait in seconds, waits indefinitely if None
+
+        Raises:
+            TimeoutError: The device has not reported back within the timeout.
         """
-        # set = self.device_ready_flag.is_set()  # TODO statement seems to have no effect
-        self.device_ready_flag.wait()
-        time.sleep(0.1)
+        if not self.device_ready_flag.wait(timeout):
+            raise TimeoutError("Device {0} did not report back within {1} s.".format(self.name, timeout))
 
     def send_and_wait_reply(self, msg):
         """
@@ -559,12 +749,17 @@ class ChemputerDevice(object):
         the entire network config.
 
         Args:
-            ip_address (str): new IP Address of the device
+            ip_address (str/tuple): new IP Address of the device, either as string or as tuple of its four numbers
         """
-        if not re.fullmatch(ip_pattern, ip_address):
+        if isinstance(ip_address, tuple):
+            ip_address = ".".join(map(str, ip_address))
+
+        try:
+            packed_address = socket.inet_pton(socket.AF_INET, ip_address)  # strict dotted quad, unlike inet_aton
+        except (OSError, TypeError):
             raise ValueError("Supplied address {0} is not a valid IP!".format(ip_address))
 
-        ip_ending = re.match(ip_pattern, ip_address).group(4)
+        ip_ending = packed_address[3]
 
         if self.device_type == "pump":
             mac_address = "0A:{0}:B0:0B:5A:55".format(ip_ending)
@@ -616,9 +811,10 @@ class ChemputerPump(ChemputerDevice):
     Extends:
         ChemputerDevice
     """
-    def __init__(self, address, name=""):
-        ChemputerDevice.__init__(self, address, name)
+    def __init__(self, address, name="", no_delay=TCP_NO_DELAY):
+        ChemputerDevice.__init__(self, address, name, no_delay)
         self.device_type = "pump"
+        self.default_config_command = None  # built on first use, the default config doesn't change
 
     def move_relative(self, volume_in_milliliters, speed_in_milliliters_per_min):
         """
@@ -675,9 +871,10 @@ class ChemputerPump(ChemputerDevice):
         Writes a default configuration for the pump to the server
         This uses the default configuration (OrderedDict) laid out in the default_configs script
         """
-        default_cfg = self.construct_pump_config()
-        pump_cfg = [val for val in default_cfg.values()]
-        self.send_command(self.WRITE_CONFIG, *pump_cfg)
+        if self.default_config_command is None:
+            default_cfg = self.construct_pump_config()
+            self.default_config_command = self.build_command(self.WRITE_CONFIG, *default_cfg.values())
+        self.send_built_command(self.default_config_command)
         self.device_ready_flag.wait()
 
     ########################################################################################
@@ -695,9 +892,10 @@ class ChemputerValve(ChemputerDevice):
     Extends:
         ChemputerDevice
     """
-    def __init__(self, address, name=""):
-        ChemputerDevice.__init__(self, address, name)
+    def __init__(self, address, name="", no_delay=TCP_NO_DELAY):
+        ChemputerDevice.__init__(self, address, name, no_delay)
         self.device_type = "valve"
+        self.default_config_command = None  # built on first use, the default config doesn't change
 
     def auto_config(self):
         """
@@ -725,9 +923,10 @@ class ChemputerValve(ChemputerDevice):
         Writes a default configuration for the valve to the server
         This uses the default configuration (OrderedDict) laid out in the default_configs script
         """
-        default_cfg = self.construct_valve_config()
-        valve_cfg = [val for val in default_cfg.values()]
-        self.send_command(self.WRITE_CONFIG, *valve_cfg)
+        if self.default_config_command is None:
+            default_cfg = self.construct_valve_config()
+            self.default_config_command = self.build_command(self.WRITE_CONFIG, *default_cfg.values())
+        self.send_built_command(self.default_config_command)
         self.device_ready_flag.wait()
 
     #########################################################################################
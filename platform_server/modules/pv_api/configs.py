@@ -1,4 +1,4 @@
-from collections import OrderedDict
+import struct
 
 ########################################################################################################################
 #                                                                                                                      #
@@ -38,13 +38,14 @@ DEFAULT_VALVE_CONFIG = {
 }
 
 # Default network configuration for CroninDevices
-DEFAULT_NETWORK_CONFIG = OrderedDict()
-DEFAULT_NETWORK_CONFIG["mac_address"] = "1A:99:B0:0B:5A:55"
-DEFAULT_NETWORK_CONFIG["ip_address"] = "192.168.1.99"
-DEFAULT_NETWORK_CONFIG["subnet_mask"] = "255.255.0.0"
-DEFAULT_NETWORK_CONFIG["gateway_ip"] = "192.168.1.1"
-DEFAULT_NETWORK_CONFIG["dns_server_ip"] = "192.168.255.255"
-DEFAULT_NETWORK_CONFIG["dhcp_flag"] = 1
+DEFAULT_NETWORK_CONFIG = {
+    "mac_address": "1A:99:B0:0B:5A:55",
+    "ip_address": "192.168.1.99",
+    "subnet_mask": "255.255.0.0",
+    "gateway_ip": "192.168.1.1",
+    "dns_server_ip": "192.168.255.255",
+    "dhcp_flag": 1
+}
 
 ########################################################################################################################
 #                                                                                                                      #
@@ -118,6 +119,20 @@ VALVE_CONFIG_ITEMS = [
     "full_revolution"           # uint32_t
 ]
 
+# Layouts of the config structs on the devices, matching the C types listed above (little endian, no padding)
+PUMP_CONFIG_STRUCT = struct.Struct("<BbBbHHHHHIII")
+VALVE_CONFIG_STRUCT = struct.Struct("<BbbBBbHHHHHHIII")
+
+# Items of a network config in the order they are reported by the devices
+NETWORK_CONFIG_ITEMS = [
+    "mac_address",
+    "ip_address",
+    "gateway_ip",
+    "subnet_mask",
+    "dns_server_ip",
+    "dhcp_flag"
+]
+
 # Keywords for parsing
 PUMP_TYPE = "PUMP"
 VALVE_TYPE = "VALVE"
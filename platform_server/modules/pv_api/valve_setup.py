@@ -12,6 +12,7 @@ send the default valve config via network and finally execute an auto configurat
 and back to home to exercise the device and make sure everything is ok.
 """
 
+import itertools
 import logging
 import serial
 from time import sleep
@@ -38,12 +39,8 @@ def convert_network_address_to_list(address, split_delimiter):
         addr_split (List): List of strings containing the values of the address minus the delimiting character
     """
     addr_split = address.split(split_delimiter)
-    for pos, val in enumerate(addr_split):
-        if split_delimiter == ":":
-            mac_seg = int(val, 16)
-            addr_split[pos] = str(mac_seg)
-        else:
-            addr_split[pos] = val
+    if split_delimiter == ":":  # MAC segments are hex and need converting to decimal
+        return [str(int(val, 16)) for val in addr_split]
 
     return addr_split
 
@@ -58,11 +55,7 @@ def construct_network_config_string(cfg_list):
     Returns:
         cfg_string (str): String containing the numbers of the addresses
     """
-    cfg_string = ""
-    for sublist in cfg_list:
-        for elem in sublist:
-            cfg_string += (elem + " ")
-    return cfg_string[:-1]
+    return " ".join(itertools.chain.from_iterable(cfg_list))
 
 
 def construct_network_config(mac_address, ip_address, subnet_mask, gateway_ip, dns_server_ip, DHCP_mode):
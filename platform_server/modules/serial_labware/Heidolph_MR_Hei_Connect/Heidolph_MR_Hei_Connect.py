@@ -13,16 +13,20 @@
 
 # system imports
 import re
-import sys
-import inspect
-import os
-import serial
+from time import sleep, time
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
+import serial
 
 # additional module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import SerialDevice, command
+
+
+# answer patterns, compiled once for all instances
+STRANSWER = re.compile(r"([0-9A-Z_]+)\r\n")
+INTANSWER = re.compile(r"([0-9A-Z_]+) (-?\d)\r\n")
+FLOATANSWER = re.compile(r"([0-9A-Z_]+) (\d+\.\d+)\r\n")
+
+KEEPALIVE_INTERVAL = 5  # seconds between two status queries resetting the watchdog
 
 
 class MRHeiConnect(SerialDevice):
@@ -50,9 +54,9 @@ class MRHeiConnect(SerialDevice):
         self.parity = serial.PARITY_EVEN
 
         # answer patterns
-        self.stranswer = re.compile("([0-9A-Z_]+)\r\n")
-        self.intanswer = re.compile("([0-9A-Z_]+) (-?\d)\r\n")
-        self.floatanswer = re.compile("([0-9A-Z_]+) (\d+\.\d+)\r\n")
+        self.stranswer = STRANSWER
+        self.intanswer = INTANSWER
+        self.floatanswer = FLOATANSWER
 
         # implemented commands
         self.OLD_PROTOCOL = "PA_OLD"
@@ -68,8 +72,18 @@ class MRHeiConnect(SerialDevice):
     def keepalive(self):
         """
         Queries the stirrer status every 5 seconds to reset the watchdog. Overrides dummy keepalive from parent method.
+        self.last_time is initialised in the parent method.
+
+        Returns:
+            wait (float): Seconds until the next query is due, so the command handler can sleep until then
         """
-        self.non_blocking_wait(callback=self.query_status, interval=5)
+        now = time()
+        elapsed = now - self.last_time
+        if elapsed < KEEPALIVE_INTERVAL:
+            return KEEPALIVE_INTERVAL - elapsed
+        self.last_time = now
+        self.query_status()
+        return KEEPALIVE_INTERVAL
 
     @command
     def switch_protocol(self, protocol="new"):
@@ -98,17 +112,23 @@ class MRHeiConnect(SerialDevice):
     def temperature_sp(self, temperature_setpoint):
         try:
             # type checking of the temperature the user provided
-            temperature_setpoint = round(int(temperature_setpoint), 1)
+            temperature_setpoint = int(temperature_setpoint)
         except ValueError:
             raise(ValueError("Error setting temperature. Temperature was not a valid integer \"{0}\"".format(temperature_setpoint)))
 
+        if not 0 <= temperature_setpoint <= 300:
+            raise ValueError("The set point should be in range 0..300")
+
         reply = self.send_message("{0} {1}".format(self.SET_TEMPERATURE_SP, temperature_setpoint), True, self.floatanswer)
 
         try:
-            if float(reply[1]) != temperature_setpoint:
-                raise ValueError("Error. Setpoint was not set correctly. Sent: {0}. Received: {1}".format(temperature_setpoint, float(reply[1])))
-        except:
-            raise ValueError("Error. Setpoint was not set correctly. Sent: {0}. Received: {1}".format(temperature_setpoint, float(reply[1])))
+            received = float(reply[1])
+        except (TypeError, IndexError, ValueError):
+            # no usable reply, e.g. no connection or the answer didn't match the pattern in soft fail mode
+            raise ValueError("Error. Setpoint was not set correctly. Sent: {0}. Received: {1}".format(temperature_setpoint, reply))
+
+        if received != temperature_setpoint:
+            raise ValueError("Error. Setpoint was not set correctly. Sent: {0}. Received: {1}".format(temperature_setpoint, received))
 
 
 if __name__ == "__main__":
@@ -122,5 +142,7 @@ if __name__ == "__main__":
     st.temperature_sp = 30
     print("getting {}".format(st.temperature_sp))
     print("starting {}".format(st.start_heating()))
+    # block without spinning to keep the daemon thread from dying; unlike a bare Event().wait(), this can still be
+    # interrupted with Ctrl-C on Windows
     while True:
-        pass  # endless loop to keep the daemon thread from dying
+        sleep(1)
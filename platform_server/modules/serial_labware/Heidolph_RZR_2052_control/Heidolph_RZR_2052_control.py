@@ -19,17 +19,17 @@ For style guide used see http://xkcd.com/1513/
 """
 
 # system imports
-import os
-import sys
-import inspect
 import re
 from time import sleep
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, ".."))
-
 # additioanl module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import SerialDevice, command
+
+
+# answer patterns, compiled once for all instances
+QUERY_ANSWER = re.compile(r"([A-Z]{3}): ([0-9]+)\r\n\r\n")  # most answers, except for status and setpoint
+SETPOINT_ANSWER = re.compile(r"R([0-9]+)\r\n([A-Z]{3}): ([0-9]+)\r\n")  # reply to setting the RPM
+STATUS_ANSWER = re.compile(r"([A-Z]{3}): (.*)\r\n")  # most answers, except for status and setpoint
 
 
 class RZR_2052(SerialDevice):
@@ -59,9 +59,9 @@ class RZR_2052(SerialDevice):
         self.read_delay = 0.1
 
         # answer patterns
-        self.query_answer = re.compile("([A-Z]{3}): ([0-9]+)\r\n\r\n")  # most answers, except for status and setpoint
-        self.setpoint_answer = re.compile("R([0-9]+)\r\n([A-Z]{3}): ([0-9]+)\r\n")  # reply to setting the RPM
-        self.status_answer = re.compile("([A-Z]{3}): (.*)\r\n")  # most answers, except for status and setpoint
+        self.query_answer = QUERY_ANSWER
+        self.setpoint_answer = SETPOINT_ANSWER
+        self.status_answer = STATUS_ANSWER
 
         # DOCUMENTED COMMANDS for easier maintenance
         self.set_rpm = "R"  # Rxxxx (1-4 digits) sets RPM. limits are 30-1000 rpm
@@ -76,6 +76,9 @@ class RZR_2052(SerialDevice):
         self.get_torque = "m"  # queries torque
         self.get_error = "f"  # No Error! / Motor Error! / Motor Temperature!
 
+        # stopping always sends the same message, no need to format it every time
+        self.stop_command = f"{self.set_rpm}{0:04}"
+
         self.launch_command_handler()
 
         if connect_on_instantiation:
@@ -123,7 +126,7 @@ class RZR_2052(SerialDevice):
         self.logger.debug("Setting stir rate to {0} RPM...".format(rpm))
         # setting the setpoint
         if 30 <= rpm <= 1000:
-            self.send_message("{0}{1:04}".format(self.set_rpm, rpm), get_return=True, return_pattern=self.setpoint_answer, multiline=True)
+            self.send_message(f"{self.set_rpm}{rpm:04}", get_return=True, return_pattern=self.setpoint_answer, multiline=True)
         else:
             raise ValueError("The set point should be in range 30..1000")
 
@@ -135,7 +138,7 @@ class RZR_2052(SerialDevice):
     @command
     def stop_stirrer(self):
         """Stops the stirrer"""
-        self.send_message("{0}{1:04}".format(self.set_rpm, 0), get_return=True, return_pattern=self.setpoint_answer, multiline=True)
+        self.send_message(self.stop_command, get_return=True, return_pattern=self.setpoint_answer, multiline=True)
 
     @command
     def get_status(self):
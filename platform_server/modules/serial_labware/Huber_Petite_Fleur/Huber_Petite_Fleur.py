@@ -19,17 +19,50 @@ For style guide used see http://xkcd.com/1513/
 """
 
 # system imports
-import os
-import sys
-import inspect
-import re
+import functools
 from time import sleep
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
-
 # additioanl module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import SerialDevice, command
+
+
+HEX_DIGITS = frozenset("0123456789ABCDEF")
+
+
+def parse_answer(answer):
+    """
+    Picks apart an answer of the chiller into address and value. The answers have a fixed layout ("{S", two digit hex
+    address, four digit hex value), so they are sliced directly instead of being matched against a regex.
+
+    Args:
+        answer (str): The stripped answer string
+
+    Returns:
+        address, value (tuple of str): The hex strings of the address and the value
+
+    Raises:
+        ValueError: The answer doesn't have the expected layout
+    """
+    if len(answer) != 8 or not answer.startswith("{S") or not HEX_DIGITS.issuperset(answer[2:]):
+        raise ValueError("Value Error. Huber chiller did not return a valid answer. Received: \"{0}\".".format(answer))
+    return answer[2:4], answer[4:]
+
+
+@functools.lru_cache(maxsize=512)
+def build_write_message(command_start, address, value):
+    """
+    Builds the message writing a raw value to one of the chiller's addresses. Setpoints tend to be sent over and over
+    again, so the finished messages are cached.
+
+    Args:
+        command_start (str): The command start sequence
+        address (str): The two digit hex address to write to
+        value (int): The raw value, sent as 16 bit two's complement hex string
+
+    Returns:
+        message (str): The complete message
+    """
+    return f"{command_start}{address}{value & 0xFFFF:04X}"
 
 
 class Huber(SerialDevice):
@@ -56,10 +89,6 @@ class Huber(SerialDevice):
         self.write_delay = 0.2
         self.read_delay = 0.2
 
-        # TODO check if actually correct
-        # answer patterns
-        self.answer = re.compile("{S([0-9A-F]{2})([0-9A-F]{4})\r?\n?")  # already picks apart address (capture group 1) and value (capture group 2)
-
         # DOCUMENTED COMMANDS for easier maintenance
         self.command_start = "{M"
         self.query = "****"  # string for reading a value
@@ -79,9 +108,13 @@ class Huber(SerialDevice):
 
         # E-grade "Exclusive" commands
         self.ramp_duration = "59"               # LSB = 1s,     range = -32767 - 32767s (negative values cancel ramp)
-        self.start_ramp = "5A"                  # LSB = 0.01°C, range = -151.00 - 327.00°C (sets sp and starts ramp)
+        self.ramp_setpoint = "5A"               # LSB = 0.01°C, range = -151.00 - 327.00°C (sets sp and starts ramp)
         # at this point I got bored, someone may want to type up all the other commands at some point
 
+        # the queries for polling never change, so they are only put together once
+        self.temperature_query = f"{self.command_start}{self.internal_temperature}{self.query}"
+        self.setpoint_query = f"{self.command_start}{self.temp_controller_setpoint}{self.query}"
+
         self.launch_command_handler()
 
         if connect_on_instantiation:
@@ -96,51 +129,41 @@ class Huber(SerialDevice):
             temp (float): Temperature setpoint
         """
         # setting the setpoint
-        if -151 <= temp <= 327:
-            temp = int(temp * 100)  # convert to appropriate decimal format
-            temp_string = "{:04X}".format(temp & 0xFFFF)  # convert to two's complement hex string
-        else:
-            raise ValueError('The set point should be in range 0..2')
+        temp = int(temp * 100)  # convert to appropriate decimal format (LSB = 0.01°C)
+        if not -15100 <= temp <= 32700:
+            raise ValueError('The set point should be in range -151..327')
 
-        self.send_message('{0}{1}{2}'.format(self.command_start, self.temp_controller_setpoint, temp_string), True, self.answer)
+        parse_answer(self.send_message(build_write_message(self.command_start, self.temp_controller_setpoint, temp), True))
 
     @command
     def start(self):
         """Starts the chiller"""
-        # start circulation
-        self.send_message('{0}{1}{2:04}'.format(self.command_start, self.circulation, 1), True, self.answer)
-        # start temperature control
-        self.send_message('{0}{1}{2:04}'.format(self.command_start, self.temperature_control, 1), True, self.answer)
+        # start circulation, then temperature control
+        parse_answer(self.send_message(build_write_message(self.command_start, self.circulation, 1), True))
+        parse_answer(self.send_message(build_write_message(self.command_start, self.temperature_control, 1), True))
 
     @command
     def stop(self):
         """Stops the chiller"""
-        # stop temperature control
-        self.send_message('{0}{1}{2:04}'.format(self.command_start, self.temperature_control, 0), True, self.answer)
-        # stop circulation
-        self.send_message('{0}{1}{2:04}'.format(self.command_start, self.circulation, 0), True, self.answer)
+        # stop temperature control, then circulation
+        parse_answer(self.send_message(build_write_message(self.command_start, self.temperature_control, 0), True))
+        parse_answer(self.send_message(build_write_message(self.command_start, self.circulation, 0), True))
 
     @command
     def get_temperature(self):
         """Reads the current temperature of the bath"""
-        answer = self.send_message('{0}{1}{2}'.format(self.command_start, self.internal_temperature, self.query), True, self.answer)
+        answer = parse_answer(self.send_message(self.temperature_query, True))
         if answer[0] == self.internal_temperature:
             # convert two's complement 16 bit signed hex to signed int
-            if int(answer[1], 16) > 32767:
-                return (int(answer[1], 16) - 65536) / 100
-            else:
-                return (int(answer[1], 16)) / 100
+            return int.from_bytes(bytes.fromhex(answer[1]), "big", signed=True) / 100
 
     @command
     def get_setpoint(self):
         """Reads the current temperature setpoint"""
-        answer = self.send_message('{0}{1}{2}'.format(self.command_start, self.temp_controller_setpoint, self.query), True, self.answer)
+        answer = parse_answer(self.send_message(self.setpoint_query, True))
         if answer[0] == self.temp_controller_setpoint:
             # convert two's complement 16 bit signed hex to signed int
-            if int(answer[1], 16) > 32767:
-                return (int(answer[1], 16) - 65536) / 100
-            else:
-                return (int(answer[1], 16)) / 100
+            return int.from_bytes(bytes.fromhex(answer[1]), "big", signed=True) / 100
 
     @command
     def set_ramp_duration(self, ramp_duration):
@@ -152,12 +175,10 @@ class Huber(SerialDevice):
             ramp_duration (int): duration of the ramp in seconds
         """
         # setting the setpoint
-        if -32767 <= ramp_duration <= 32767:
-            ramp_duration_string = "{:04X}".format(ramp_duration & 0xFFFF)  # convert to two's complement hex string
-        else:
+        if not -32767 <= ramp_duration <= 32767:
             raise ValueError('The set point should be in range -32767..32767')
 
-        self.send_message('{0}{1}{2}'.format(self.command_start, self.set_ramp_duration, ramp_duration_string), True, self.answer)
+        parse_answer(self.send_message(build_write_message(self.command_start, self.ramp_duration, ramp_duration), True))
 
     @command
     def start_ramp(self, temp):
@@ -168,13 +189,11 @@ class Huber(SerialDevice):
             temp (float): Temperature setpoint
         """
         # setting the setpoint
-        if -151 <= temp <= 327:
-            temp = int(temp * 100)  # convert to appropriate decimal format
-            temp_string = "{:04X}".format(temp & 0xFFFF)  # convert to two's complement hex string
-        else:
-            raise ValueError('The set point should be in range 0..2')
+        temp = int(temp * 100)  # convert to appropriate decimal format (LSB = 0.01°C)
+        if not -15100 <= temp <= 32700:
+            raise ValueError('The set point should be in range -151..327')
 
-        self.send_message('{0}{1}{2}'.format(self.command_start, self.start_ramp, temp_string), True, self.answer)
+        parse_answer(self.send_message(build_write_message(self.command_start, self.ramp_setpoint, temp), True))
 
     # @command
     # def get_status(self):
@@ -22,20 +22,13 @@ For style guide used see http://xkcd.com/1513/
 """
 
 # system imports
-import re
-import serial
-import os
-import inspect
-import sys
-
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
+from time import sleep
 
 # additional module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import IKASerialDevice, command, parse_value_answer
 
 
-class IKARETControlVisc(SerialDevice):
+class IKARETControlVisc(IKASerialDevice):
     """
     This provides a python class for the IKA RET Control Visc Hotplates
     The command implementation is based on the english manual:
@@ -43,6 +36,34 @@ class IKARETControlVisc(SerialDevice):
         the german version, same file pages 15 - 18 appears to contain more and better information.
     """
 
+    # DOCUMENTED COMMANDS for easier maintenance
+    GET_STIR_RATE_PV = "IN_PV_4"
+    GET_STIR_RATE_SP = "IN_SP_4"
+    SET_STIR_RATE_SP = "OUT_SP_4"
+    GET_TEMP_PV = "IN_PV_1"
+    GET_TEMP_SP = "IN_SP_1"
+    SET_TEMP_SP = "OUT_SP_1"
+    START_TEMP = "START_1"
+    STOP_TEMP = "STOP_1"
+    START_STIR = "START_4"
+    STOP_STIR = "STOP_4"
+    START_PH = "START_80"
+    STOP_PH = "STOP_80"
+    START_WEIGHING = "START_90"
+    STOP_WEIGHING = "STOP_90"
+    RESET = "RESET"
+    GET_NAME = "IN_NAME"
+    SET_NAME = "OUT_NAME"
+    GET_SOFTWARE_VERSION = "IN_SOFTWARE"
+    GET_MEDIUM_TEMPERATURE_SP = "IN_SP_7"
+    GET_HOT_PLATE_TEMPERATURE_PV = "IN_PV_2"
+    GET_HOT_PLATE_TEMPERATURE_SP = "IN_SP_2"
+    SET_HOT_PLATE_TEMPERATURE_SP = "OUT_SP_2"
+    GET_HOT_PLATE_SAFETY_TEMPERATURE_PV = "IN_PV_3"
+    GET_HOT_PLATE_SAFETY_TEMPERATURE_SP = "IN_SP_3"
+    GET_PH_PV = "IN_PV_80"
+    GET_WEIGHT_PV = "IN_PV_90"
+
     def __init__(self, port=None, device_name=None, connect_on_instantiation=False, soft_fail_for_testing=False):
         """
         Initializer of the IKARETControlVisc class.
@@ -58,72 +79,33 @@ class IKARETControlVisc(SerialDevice):
         super().__init__(port, device_name, soft_fail_for_testing)
 
         # serial settings
-        self.baudrate = 9600
-        self.bytesize = serial.SEVENBITS
-        self.parity = serial.PARITY_EVEN
         self.rtscts = True
 
-        self.write_delay = 0.1
-        self.read_delay = 0.1
-
-        # answer patterns
-        self.stranswer = re.compile("([0-9A-Z_]+)\r\n")
-        self.valueanswer = re.compile("(\d+\.\d+) (\d)\r\n")
-        self.wdanswer = re.compile("(\d+\.\d+)\r\n")
-
         # other settings
         self.IKA_default_name = "IKARET"
 
-        # DOCUMENTED COMMANDS for easier maintenance
-        self.GET_STIR_RATE_PV = "IN_PV_4"
-        self.GET_STIR_RATE_SP = "IN_SP_4"
-        self.SET_STIR_RATE_SP = "OUT_SP_4"
-        self.GET_TEMP_PV = "IN_PV_1"
-        self.GET_TEMP_SP = "IN_SP_1"
-        self.SET_TEMP_SP = "OUT_SP_1"
-        self.START_TEMP = "START_1"
-        self.STOP_TEMP = "STOP_1"
-        self.START_STIR = "START_4"
-        self.STOP_STIR = "STOP_4"
-        self.START_PH = "START_80"
-        self.STOP_PH = "STOP_80"
-        self.START_WEIGHING = "START_90"
-        self.STOP_WEIGHING = "STOP_90"
-        self.RESET = "RESET"
-        self.GET_NAME = "IN_NAME"
-        self.SET_NAME = "OUT_NAME"
-        self.GET_SOFTWARE_VERSION = "IN_SOFTWARE"
-        self.GET_MEDIUM_TEMPERATURE_SP = "IN_SP_7"
-        self.GET_HOT_PLATE_TEMPERATURE_PV = "IN_PV_2"
-        self.GET_HOT_PLATE_TEMPERATURE_SP = "IN_SP_2"
-        self.SET_HOT_PLATE_TEMPERATURE_SP = "OUT_SP_2"
-        self.GET_HOT_PLATE_SAFETY_TEMPERATURE_PV = "IN_PV_3"
-        self.GET_HOT_PLATE_SAFETY_TEMPERATURE_SP = "IN_SP_3"
-        self.GET_PH_PV = "IN_PV_80"
-        self.GET_WEIGHT_PV = "IN_PV_90"
-
         self.launch_command_handler()
 
         if connect_on_instantiation:
             self.open_connection()
 
     @property
-    @command
+    @command(sync=True)
     def stir_rate_pv(self):
         """
         Reads the process variable (i.e. the current) stir rate
         :return: call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_STIR_RATE_PV, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_STIR_RATE_PV, True))
 
     @property
-    @command
+    @command(sync=True)
     def stir_rate_sp(self):
         """
         Reads the set point (target) for the stir rate
         :return: call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_STIR_RATE_SP, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_STIR_RATE_SP, True))
 
     @stir_rate_sp.setter
     @command
@@ -137,6 +119,19 @@ class IKARETControlVisc(SerialDevice):
         Returns:
             call back to get_stirrer_rate_set_point()
         """
+        # actually sending the command
+        self.send_message(self.stir_rate_message(stir_rate))
+
+    def stir_rate_message(self, stir_rate):
+        """
+        Checks the stir rate the user provided and builds the message setting it.
+
+        Args:
+            stir_rate (int): the target stir rate of the hot plate
+
+        Returns:
+            message (str): the message setting the stir rate
+        """
         try:
             # type checking of the stir rate that the user provided
             stir_rate = int(stir_rate)
@@ -145,19 +140,33 @@ class IKARETControlVisc(SerialDevice):
 
         self.logger.debug("Setting stir rate to {0} RPM...".format(stir_rate))
 
-        # actually sending the command
-        self.send_message("{0} {1}".format(self.SET_STIR_RATE_SP, stir_rate))
+        return f"{self.SET_STIR_RATE_SP} {stir_rate}"
 
-    @property
     @command
+    def set_and_verify_stir_rate(self, stir_rate):
+        """
+        Sets the stir rate and reads back the set point within the same command, so nothing else can be sent to the
+        hot plate in between. The two messages are sent separately to keep the write delay between them.
+
+        Args:
+            stir_rate (int): the target stir rate of the hot plate
+
+        Returns:
+            stir_rate_sp (tuple): the set point as reported by the hot plate
+        """
+        self.send_message(self.stir_rate_message(stir_rate))
+        return parse_value_answer(self.send_message(self.GET_STIR_RATE_SP, True))
+
+    @property
+    @command(sync=True)
     def temperature_pv(self):
         # reading the process variable
-        return self.send_message(self.GET_TEMP_PV, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_TEMP_PV, True))
 
     @property
-    @command
+    @command(sync=True)
     def temperature_sp(self):
-        return self.send_message(self.GET_TEMP_SP, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_TEMP_SP, True))
 
     @temperature_sp.setter
     @command
@@ -168,6 +177,19 @@ class IKARETControlVisc(SerialDevice):
         Args:
             temperature (float): the target temperature
         """
+        # actually sending the command
+        self.send_message(self.temperature_message(temperature))
+
+    def temperature_message(self, temperature):
+        """
+        Checks the temperature the user provided and builds the message setting it.
+
+        Args:
+            temperature (float): the target temperature
+
+        Returns:
+            message (str): the message setting the temperature
+        """
         try:
             temperature = float(temperature)
         except ValueError:
@@ -175,8 +197,22 @@ class IKARETControlVisc(SerialDevice):
 
         self.logger.debug("Setting temperature setpoint to {0}°C...".format(temperature))
 
-        # actually sending the command
-        self.send_message("{0} {1}".format(self.SET_TEMP_SP, temperature))
+        return f"{self.SET_TEMP_SP} {temperature}"
+
+    @command
+    def set_and_verify_temperature(self, temperature):
+        """
+        Sets the target temperature and reads back the set point within the same command, so nothing else can be sent
+        to the hot plate in between. The two messages are sent separately to keep the write delay between them.
+
+        Args:
+            temperature (float): the target temperature
+
+        Returns:
+            temperature_sp (tuple): the set point as reported by the hot plate
+        """
+        self.send_message(self.temperature_message(temperature))
+        return parse_value_answer(self.send_message(self.GET_TEMP_SP, True))
 
     @command
     def start_heater(self):
@@ -219,7 +255,7 @@ class IKARETControlVisc(SerialDevice):
         return self.send_message(self.RESET)
 
     @property
-    @command
+    @command(sync=True)
     def name(self):
         """
         Returns the name of the hot plate
@@ -244,7 +280,7 @@ class IKARETControlVisc(SerialDevice):
         self.send_message("{0} {1}".format(self.SET_NAME, name))
 
     @property
-    @command
+    @command(sync=True)
     def software_version(self):
         """
         Returns the software version of the firmware
@@ -268,19 +304,19 @@ class IKARETControlVisc(SerialDevice):
         pass
 
     @property
-    @command
+    @command(sync=True)
     def temperature_heat_transfer_medium_sp(self):
-        return self.send_message(self.GET_MEDIUM_TEMPERATURE_SP, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_MEDIUM_TEMPERATURE_SP, True))
 
     @property
-    @command
+    @command(sync=True)
     def temperature_hot_plate_pv(self):
-        return self.send_message(self.GET_HOT_PLATE_TEMPERATURE_PV, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_HOT_PLATE_TEMPERATURE_PV, True))
 
     @property
-    @command
+    @command(sync=True)
     def temperature_hot_plate_sp(self):
-        return self.send_message(self.GET_HOT_PLATE_TEMPERATURE_SP, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_HOT_PLATE_TEMPERATURE_SP, True))
 
     @temperature_hot_plate_sp.setter
     @command
@@ -297,27 +333,55 @@ class IKARETControlVisc(SerialDevice):
             raise(ValueError("Error setting hot plate temperature. "
                              "Value was not a valid float \"{0}\"".format(temperature)
                              ))
-        self.send_message("{0} {1}".format(self.SET_HOT_PLATE_TEMPERATURE_SP, temperature))
+        self.send_message(f"{self.SET_HOT_PLATE_TEMPERATURE_SP} {temperature}")
 
     @property
-    @command
+    @command(sync=True)
     def temperature_hot_plate_safety_pv(self):
         """
         This is a documented function and does return values, but I cannot figure out what it's supposed to be...
         :return: excellent question...
         """
         self.logger.debug("WARNING! Don't use temperature_hot_plate_safety_pv! (see docstring)")
-        return self.send_message(self.GET_HOT_PLATE_SAFETY_TEMPERATURE_PV, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_HOT_PLATE_SAFETY_TEMPERATURE_PV, True))
 
     @property
-    @command
+    @command(sync=True)
     def temperature_hot_plate_safety_sp(self):
         """
         This returns the current safety temperature set point. There is no equivalent setter function (for obvious
             safety reasons, it actually does not exist in the firmware)
         :return: The current setting of the hot plate safety temperature
         """
-        return self.send_message(self.GET_HOT_PLATE_SAFETY_TEMPERATURE_SP, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_HOT_PLATE_SAFETY_TEMPERATURE_SP, True))
+
+    @command(sync=True)
+    def read_bulk(self, queries):
+        """
+        Sends several queries one after the other within a single command, so nothing else is sent to the hotplate
+        in between, and parses the answers. Each query is paced by the usual write delay.
+        :param list queries: The query commands, e.g. [self.GET_TEMP_PV, self.GET_TEMP_SP]
+        :return: list of parsed answers, one per query
+        """
+        return [parse_value_answer(self.send_message(query, True)) for query in queries]
+
+    def snapshot(self):
+        """
+        Reads the process values and set points of the temperatures and the stir rate in one go.
+        :return: dict of the parsed answers, keyed by the name of the respective property
+        """
+        readings = [
+            ("temperature_pv", self.GET_TEMP_PV),
+            ("temperature_sp", self.GET_TEMP_SP),
+            ("temperature_hot_plate_pv", self.GET_HOT_PLATE_TEMPERATURE_PV),
+            ("temperature_hot_plate_sp", self.GET_HOT_PLATE_TEMPERATURE_SP),
+            ("temperature_hot_plate_safety_pv", self.GET_HOT_PLATE_SAFETY_TEMPERATURE_PV),
+            ("temperature_hot_plate_safety_sp", self.GET_HOT_PLATE_SAFETY_TEMPERATURE_SP),
+            ("stir_rate_pv", self.GET_STIR_RATE_PV),
+            ("stir_rate_sp", self.GET_STIR_RATE_SP),
+        ]
+        answers = self.read_bulk([query for _, query in readings])
+        return {name: answer for (name, _), answer in zip(readings, answers)}
 
     @command
     def get_viscosity_trend(self):
@@ -325,24 +389,27 @@ class IKARETControlVisc(SerialDevice):
 
     @command
     def get_ph(self):
-        return self.send_message(self.GET_PH_PV, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_PH_PV, True))
 
     @command
     def get_weight(self):
         # only works with start weight, takes about 4 sec to calibrate
-        return self.send_message(self.GET_WEIGHT_PV, True, self.valueanswer)
+        return parse_value_answer(self.send_message(self.GET_WEIGHT_PV, True))
 
 
 if __name__ == '__main__':
     hp = IKARETControlVisc(port="COM5", connect_on_instantiation=True)
-    hp.temperature_sp = 40  # setting temperature to 100 °C
-    print("temperature_pv {}".format(hp.temperature_pv))
-    hp.start_heater()  # starting the heater
-    hp.stop_heater()  # stopping heater
-    print("temperature_hot_plate_safety_pv {}".format(hp.temperature_hot_plate_pv))
-    print("temperature_hot_plate_safety_sp {}".format(hp.temperature_hot_plate_sp))
-    print("temperature_hot_plate_safety_pv {}".format(hp.temperature_hot_plate_safety_pv))
-    print("temperature_hot_plate_safety_sp {}".format(hp.temperature_hot_plate_safety_sp))
-    print("software_version {}".format(hp.software_version))
-    while True:
-        pass
+    try:
+        hp.temperature_sp = 40  # setting temperature to 100 °C
+        print("temperature_pv {}".format(hp.temperature_pv))
+        hp.start_heater()  # starting the heater
+        hp.stop_heater()  # stopping heater
+        for name, value in hp.snapshot().items():
+            print("{0} {1}".format(name, value))
+        print("software_version {}".format(hp.software_version))
+        # idle until interrupted without keeping a core busy; a bare Event().wait() cannot be interrupted on Windows
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        hp.stop_heater()
+        hp.stop_stirrer()
@@ -22,22 +22,14 @@ For style guide used see http://xkcd.com/1513/
 """
 
 # system imports
-import re
-import serial
-import os
-import inspect
-import sys
 from time import sleep, time
 from threading import Event
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
-
 # additional module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import IKASerialDevice, command, parse_value_answer
 
 
-class IKARV10(SerialDevice):
+class IKARV10(IKASerialDevice):
     """
     This provides a python class for the IKA RV 10 rotary evaporator
     with IKA HB 10 heating bath.
@@ -47,6 +39,32 @@ class IKARV10(SerialDevice):
     correspondence with IKA and by trial and error.
     """
 
+    # DOCUMENTED COMMANDS for easier maintenance
+    GET_ROTATION_PV = "IN_PV_4"
+    GET_ROTATION_SP = "IN_SP_4"
+    SET_ROTATION_SP = "OUT_SP_4"  # 20-280 RPM
+    GET_TEMP_PV = "IN_PV_2"
+    GET_TEMP_SP = "IN_SP_2"
+    SET_TEMP_SP = "OUT_SP_2"  # 0-180°C, max. T is safety temperature minus 10°C, T>90°C switches to oil mode
+    GET_SAFETY_TEMP_SP = "IN_SP_2"
+    SET_SAFETY_TEMP_SP = "OUT_SP_2"
+    START_TEMP = "START_2"
+    STOP_TEMP = "STOP_2"
+    START_ROTATION = "START_4"
+    STOP_ROTATION = "STOP_4"
+    RESET = "RESET"
+    GET_NAME = "IN_NAME"
+    SET_NAME = "OUT_NAME"
+    GET_SOFTWARE_VERSION = "IN_SOFTWARE"
+    SET_INTERVAL_SP = "OUT_SP_60"  # 1-60s, "0" switches mode off
+    SET_TIMER_SP = "OUT_SP_61"  # 1-199min, "0" switches mode off
+    LIFT_UP = "OUT_SP_62 1"
+    LIFT_DOWN = "OUT_SP_63 1"
+
+    MAX_RPM = 280
+
+    MAX_RETRIES = 10
+
     def __init__(self, port=None, device_name=None, connect_on_instantiation=False, soft_fail_for_testing=False):
         """
         Initializer of the IKARV10 class
@@ -57,45 +75,6 @@ class IKARV10(SerialDevice):
         """
         super().__init__(port, device_name, soft_fail_for_testing)
 
-        # serial settings
-        self.baudrate = 9600
-        self.bytesize = serial.SEVENBITS
-        self.parity = serial.PARITY_EVEN
-
-        self.write_delay = 0.1
-        self.read_delay = 0.1
-
-        # answer patterns
-        self.stranswer = re.compile("([0-9A-Z_]+)\r\n")
-        self.intanswer = re.compile("(\d+) (\d)\r\n")
-        self.floatanswer = re.compile("(\d+\.\d+) (\d)\r\n")
-
-        # DOCUMENTED COMMANDS for easier maintenance
-        self.GET_ROTATION_PV = "IN_PV_4"
-        self.GET_ROTATION_SP = "IN_SP_4"
-        self.SET_ROTATION_SP = "OUT_SP_4"  # 20-280 RPM
-        self.GET_TEMP_PV = "IN_PV_2"
-        self.GET_TEMP_SP = "IN_SP_2"
-        self.SET_TEMP_SP = "OUT_SP_2"  # 0-180°C, max. T is safety temperature minus 10°C, T>90°C switches to oil mode
-        self.GET_SAFETY_TEMP_SP = "IN_SP_2"
-        self.SET_SAFETY_TEMP_SP = "OUT_SP_2"
-        self.START_TEMP = "START_2"
-        self.STOP_TEMP = "STOP_2"
-        self.START_ROTATION = "START_4"
-        self.STOP_ROTATION = "STOP_4"
-        self.RESET = "RESET"
-        self.GET_NAME = "IN_NAME"
-        self.SET_NAME = "OUT_NAME"
-        self.GET_SOFTWARE_VERSION = "IN_SOFTWARE"
-        self.SET_INTERVAL_SP = "OUT_SP_60"  # 1-60s, "0" switches mode off
-        self.SET_TIMER_SP = "OUT_SP_61"  # 1-199min, "0" switches mode off
-        self.LIFT_UP = "OUT_SP_62 1"
-        self.LIFT_DOWN = "OUT_SP_63 1"
-
-        self.MAX_RPM = 280
-
-        self.MAX_RETRIES = 10
-
         self.heating_on = Event()  # communicator for switching the keepalive on or off
 
         self.launch_command_handler()
@@ -109,54 +88,57 @@ class IKARV10(SerialDevice):
         keepalive from parent method. This does not utilise the non_blocking_wait method because passing a property as
         callback leads to unwanted behaviour (i.e. property gets read on every loop iteration, not just
         every x seconds). self.last_time is initialised in the parent method.
+
+        Returns:
+            wait (float): Seconds until the next query is due, so the command handler can sleep until then
         """
-        if time() >= (self.last_time + 2):
-            self.last_time = time()
-            if self.heating_on.is_set():
-                temp = self.temperature_pv
-                try:
-                    floattemp = float(temp[0])
-                except Exception:
-                    self.logger.exception("Oh noes! Something went wrong!")
-        else:
-            return None
+        now = time()
+        elapsed = now - self.last_time
+        if elapsed < 2:
+            return 2 - elapsed
+        self.last_time = now
+        if self.heating_on.is_set():
+            try:
+                self.temperature_pv  # the answer is checked while parsing, the value itself isn't needed
+            except Exception:
+                self.logger.exception("Oh noes! Something went wrong!")
+        return 2
 
     @command
     def initialise(self):
         """
         Due to unspeakable firmware dumbfuckery both rotavap and heating bath only actually enter remote mode
         after a start command has been sent. This method starts and stops both devices to force them into
-        remote mode.
+        remote mode. The commands get no answer, so they are sent one by one to keep the write delay between them.
         :return: True if successful, False if not
         """
         self.logger.debug("Initialising IKA RV10...")
         try:
-            self.start_rotation()
-            self.stop_rotation()
-            self.start_heater()
-            self.stop_heater()
+            for message in (self.START_ROTATION, self.STOP_ROTATION, self.START_TEMP, self.STOP_TEMP):
+                self.send_message(message)
+            self.heating_on.clear()
             return True
         except Exception as e:
             self.logger.critical("Error while initialising rotavap: {0}".format(e))
             return False
 
     @property
-    @command
+    @command(sync=True)
     def rotation_speed_pv(self):
         """
         Reads the process variable (i.e. the current) rpm
         :return: call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_ROTATION_PV, True, self.intanswer)
+        return parse_value_answer(self.send_message(self.GET_ROTATION_PV, True), int)
 
     @property
-    @command
+    @command(sync=True)
     def rotation_speed_sp(self):
         """
         Reads the set point (target) for the rpm
         :return: call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_ROTATION_SP, True, self.intanswer)
+        return parse_value_answer(self.send_message(self.GET_ROTATION_SP, True), int)
 
     @rotation_speed_sp.setter
     @command
@@ -165,6 +147,15 @@ class IKARV10(SerialDevice):
         Sets the rotation speed and return the set point from the rotavap so the user can verify that it was successful
         :param rpm: (integer) the target rotation speed of the rotavap
         """
+        # actually sending the command
+        self.send_message(self.rotation_speed_message(rpm))
+
+    def rotation_speed_message(self, rpm):
+        """
+        Checks the rotation speed the user provided and builds the message setting it
+        :param rpm: (integer) the target rotation speed of the rotavap
+        :return: the message setting the rotation speed
+        """
         try:
             # type checking of the rotation speed that the user provided
             rpm = int(rpm)
@@ -176,19 +167,29 @@ class IKARV10(SerialDevice):
 
         self.logger.debug("Setting rotation speed to {0} RPM...".format(rpm))
 
-        # actually sending the command
-        self.send_message("{0} {1}".format(self.SET_ROTATION_SP, rpm))
+        return f"{self.SET_ROTATION_SP} {rpm}"
 
-    @property
     @command
+    def set_and_verify_rotation(self, rpm):
+        """
+        Sets the rotation speed and reads back the set point within the same command, so nothing else can be sent to
+        the rotavap in between. The two messages are sent separately to keep the write delay between them
+        :param rpm: (integer) the target rotation speed of the rotavap
+        :return: the set point as reported by the rotavap
+        """
+        self.send_message(self.rotation_speed_message(rpm))
+        return parse_value_answer(self.send_message(self.GET_ROTATION_SP, True), int)
+
+    @property
+    @command(sync=True)
     def temperature_pv(self):
         # reading the process variable
-        return self.send_message(self.GET_TEMP_PV, True, self.floatanswer)
+        return parse_value_answer(self.send_message(self.GET_TEMP_PV, True))
 
     @property
-    @command
+    @command(sync=True)
     def temperature_sp(self):
-        return self.send_message(self.GET_TEMP_SP, True, self.floatanswer)
+        return parse_value_answer(self.send_message(self.GET_TEMP_SP, True))
 
     @temperature_sp.setter
     @command
@@ -197,6 +198,14 @@ class IKARV10(SerialDevice):
         Sets the target temperature for the heating bath"
         :param temperature: (float) the target temperature
         """
+        self.send_message(self.temperature_message(temperature))
+
+    def temperature_message(self, temperature):
+        """
+        Checks the temperature the user provided and builds the message setting it
+        :param temperature: (float) the target temperature
+        :return: the message setting the temperature
+        """
         try:
             temperature = int(temperature)
         except ValueError:
@@ -204,7 +213,18 @@ class IKARV10(SerialDevice):
 
         self.logger.debug("Setting heating bath temperature to {0}°C...".format(temperature))
 
-        self.send_message("{0} {1}".format(self.SET_TEMP_SP, temperature))
+        return f"{self.SET_TEMP_SP} {temperature}"
+
+    @command
+    def set_and_verify_temperature(self, temperature):
+        """
+        Sets the target temperature and reads back the set point within the same command, so nothing else can be sent
+        to the heating bath in between. The two messages are sent separately to keep the write delay between them
+        :param temperature: (float) the target temperature
+        :return: the set point as reported by the heating bath
+        """
+        self.send_message(self.temperature_message(temperature))
+        return parse_value_answer(self.send_message(self.GET_TEMP_SP, True))
 
     @command
     def set_interval_sp(self, interval=None):
@@ -222,7 +242,7 @@ class IKARV10(SerialDevice):
 
         self.logger.debug("Setting interval time to {0}°C...".format(interval))
 
-        self.send_message("{0} {1}".format(self.SET_INTERVAL_SP, interval))
+        self.send_message(f"{self.SET_INTERVAL_SP} {interval}")
 
     @command
     def start_heater(self):
@@ -262,7 +282,7 @@ class IKARV10(SerialDevice):
         return self.send_message(self.RESET)
 
     @property
-    @command
+    @command(sync=True)
     def name(self):
         """
         Returns the name of the rotavap
@@ -285,7 +305,7 @@ class IKARV10(SerialDevice):
     #     self.send_message("{0} {1}".format(self.SET_NAME, name))
 
     @property
-    @command
+    @command(sync=True)
     def software_version(self):
         """
         Returns the software version of the firmware
@@ -295,9 +315,9 @@ class IKARV10(SerialDevice):
         return self.send_message(self.GET_SOFTWARE_VERSION, True)
 
     @property
-    @command
+    @command(sync=True)
     def safety_temp(self):
-        return self.send_message(self.GET_SAFETY_TEMP_SP, True, self.floatanswer)
+        return parse_value_answer(self.send_message(self.GET_SAFETY_TEMP_SP, True))
 
     @safety_temp.setter
     @command
@@ -310,7 +330,7 @@ class IKARV10(SerialDevice):
             temperature = float(temperature)
         except ValueError:
             raise(ValueError("Error setting heating bath temperature. Value was not a valid float \"{0}\"".format(temperature)))
-        self.send_message("{0} {1}".format(self.SET_SAFETY_TEMP_SP, temperature))
+        self.send_message(f"{self.SET_SAFETY_TEMP_SP} {temperature}")
 
     @command
     def set_interval(self, interval):
@@ -323,7 +343,7 @@ class IKARV10(SerialDevice):
         except ValueError:
             raise(ValueError("Error setting interval time. Value was not a valid integer \"{0}\"".format(interval)))
         self.logger.debug("Setting interval time to {0}s...".format(interval))
-        self.send_message("{0} {1}".format(self.SET_INTERVAL_SP, interval))
+        self.send_message(f"{self.SET_INTERVAL_SP} {interval}")
 
     @command
     def set_timer(self, time_setpoint):
@@ -335,22 +355,27 @@ class IKARV10(SerialDevice):
             time_setpoint = float(time_setpoint)
         except ValueError:
             raise (ValueError("Error setting timer. Value was not a valid integer \"{0}\"".format(time_setpoint)))
-        self.send_message("{0} {1}".format(self.SET_TIMER_SP, time_setpoint))
+        self.send_message(f"{self.SET_TIMER_SP} {time_setpoint}")
 
 
 if __name__ == '__main__':
     rv = IKARV10(port="COM5", connect_on_instantiation=True)
-    sleep(1)
-    rv.initialise()
-    rv.temperature_sp = 30  # setting temperature to 30 °C
-    print("Temp {}".format(rv.temperature_pv))
-    rv.start_rotation()  # starting the heater
-    # rv.stop_heater()  # stopping heater
-    sleep(1)
-    print("Safety temp {}".format(rv.safety_temp))
-    print("Temp {}".format(rv.temperature_pv))
-    print("Speed {}".format(rv.rotation_speed_pv))
-    # print("Name {}".format(rv.name))
-    # print("Ver {}".format(rv.software_version))
-    while True:
-        pass
+    try:
+        sleep(1)
+        rv.initialise()
+        rv.temperature_sp = 30  # setting temperature to 30 °C
+        print("Temp {}".format(rv.temperature_pv))
+        rv.start_rotation()  # starting the heater
+        # rv.stop_heater()  # stopping heater
+        sleep(1)
+        print("Safety temp {}".format(rv.safety_temp))
+        print("Temp {}".format(rv.temperature_pv))
+        print("Speed {}".format(rv.rotation_speed_pv))
+        # print("Name {}".format(rv.name))
+        # print("Ver {}".format(rv.software_version))
+        # idle until interrupted without keeping a core busy; a bare Event().wait() cannot be interrupted on Windows
+        while True:
+            sleep(1)
+    except KeyboardInterrupt:
+        rv.stop_heater()
+        rv.stop_rotation()
@@ -20,16 +20,10 @@ For style guide used see http://xkcd.com/1513/
 
 # system imports
 import re
-import os
-import inspect
-import sys
 from time import sleep
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
-
 # additional module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import SerialDevice, command
 
 
 class IKAmicrostar75(SerialDevice):
@@ -38,6 +32,29 @@ class IKAmicrostar75(SerialDevice):
     The command implementation is based on the German manual pages 32-34.
     """
 
+    # answer patterns, compiled once for all instances
+    VALUE_ANSWER = re.compile(r"(\d+\.\d+) (\d)\r\n")
+    DIR_ANSWER = re.compile(r"IN_MODE_(\d)\r\n")
+
+    # DOCUMENTED COMMANDS for easier maintenance
+    GET_NAME = "IN_NAME"
+    GET_TEMP_PV = "IN_PV_3"
+    GET_STIR_RATE_PV = "IN_PV_4"
+    GET_TORQUE_PV = "IN_PV_5"
+    GET_STIR_RATE_SP = "IN_SP_4"
+    GET_TORQUE_SP = "IN_SP_5"
+    GET_MAX_RPM = "IN_SP_6"
+    GET_SAFETY_RPM = "IN_SP_8"
+    SET_STIR_RATE_SP = "OUT_SP_4"
+    SET_TORQUE_SP = "OUT_SP_5"
+    SET_MAX_RPM = "OUT_SP_6"
+    SET_SAFETY_RPM = "OUT_SP_8"
+    START_STIR = "START_4"
+    STOP_STIR = "STOP_4"
+    RESET = "RESET"
+    SET_DIRECTION = "OUT_MODE_"  # argument: 1 or 2
+    GET_DIRECTION = "IN_MODE"
+
     def __init__(self, port=None, device_name=None, connect_on_instantiation=False, soft_fail_for_testing=False):
         """
         Initializer of the IKAmicrostar75 class
@@ -58,28 +75,7 @@ class IKAmicrostar75(SerialDevice):
         self.write_delay = 0.1
         self.read_delay = 0.1
 
-        # answer patterns
-        self.valueanswer = re.compile("(\d+\.\d+) (\d)\r\n")
-        self.diranswer = re.compile("IN_MODE_(\d)\r\n")
-
-        # DOCUMENTED COMMANDS for easier maintenance
-        self.GET_NAME = "IN_NAME"
-        self.GET_TEMP_PV = "IN_PV_3"
-        self.GET_STIR_RATE_PV = "IN_PV_4"
-        self.GET_TORQUE_PV = "IN_PV_5"
-        self.GET_STIR_RATE_SP = "IN_SP_4"
-        self.GET_TORQUE_SP = "IN_SP_5"
-        self.GET_MAX_RPM = "IN_SP_6"
-        self.GET_SAFETY_RPM = "IN_SP_8"
-        self.SET_STIR_RATE_SP = "OUT_SP_4"
-        self.SET_TORQUE_SP = "OUT_SP_5"
-        self.SET_MAX_RPM = "OUT_SP_6"
-        self.SET_SAFETY_RPM = "OUT_SP_8"
-        self.START_STIR = "START_4"
-        self.STOP_STIR = "STOP_4"
-        self.RESET = "RESET"
-        self.SET_DIRECTION = "OUT_MODE_"  # argument: 1 or 2
-        self.GET_DIRECTION = "IN_MODE"
+        self.last_stir_rate_sp = None  # last stir rate sent to the stirrer, restored after starting it
 
         self.launch_command_handler()
 
@@ -95,7 +91,7 @@ class IKAmicrostar75(SerialDevice):
         Returns:
             call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_STIR_RATE_PV, True, self.valueanswer)
+        return self.send_message(self.GET_STIR_RATE_PV, True, self.VALUE_ANSWER)
 
     @property
     @command
@@ -106,7 +102,7 @@ class IKAmicrostar75(SerialDevice):
         Returns:
             call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_STIR_RATE_SP, True, self.valueanswer)
+        return self.send_message(self.GET_STIR_RATE_SP, True, self.VALUE_ANSWER)
 
     @stir_rate_sp.setter
     @command
@@ -123,10 +119,11 @@ class IKAmicrostar75(SerialDevice):
         except ValueError:
             raise(ValueError("Error setting stir rate. Rate was not a valid integer \"{0}\"".format(stir_rate)))
 
-        self.logger.debug("Setting stir rate to {0} RPM...".format(stir_rate))
+        self.logger.debug("Setting stir rate to %s RPM...", stir_rate)
 
         # actually sending the command
-        self.send_message("{0} {1}".format(self.SET_STIR_RATE_SP, stir_rate))
+        self.send_message(f"{self.SET_STIR_RATE_SP} {stir_rate}")
+        self.last_stir_rate_sp = stir_rate
 
     @property
     @command
@@ -137,16 +134,20 @@ class IKAmicrostar75(SerialDevice):
         Returns:
             call back to send_message with a request to return and check a value
         """
-        return self.send_message(self.GET_TEMP_PV, True, self.valueanswer)
+        return self.send_message(self.GET_TEMP_PV, True, self.VALUE_ANSWER)
 
     @command
     def start_stirrer(self):
         """
         Starts the stirring operation. Since the stirrer "forgets" the current stir rate every time "START" is sent,
-        the method first queries the current setpoint, then starts the stirrer, then sets the RPM again.
+        the method starts the stirrer, then sets the RPM again. The last stir rate set through this class is used for
+        that, the setpoint is only queried from the stirrer if none was set yet. Changes made on the keypad in the
+        meantime are therefore not picked up.
         """
         self.logger.debug("Starting stirrer...")
-        current_rpm = int(float(self.stir_rate_sp[0]))
+        current_rpm = self.last_stir_rate_sp
+        if current_rpm is None:
+            current_rpm = int(float(self.stir_rate_sp[0]))
         self.send_message(self.START_STIR)
         self.stir_rate_sp = current_rpm
 
@@ -181,7 +182,7 @@ class IKAmicrostar75(SerialDevice):
         Returns:
             either "cw" or "ccw" depending on the currently set direction
         """
-        current_direction = self.send_message(self.GET_DIRECTION, True, self.diranswer)
+        current_direction = self.send_message(self.GET_DIRECTION, True, self.DIR_ANSWER)
         if current_direction == 1:
             return "cw"
         elif current_direction == 2:
@@ -199,9 +200,9 @@ class IKAmicrostar75(SerialDevice):
             stir_direction (str): either "cw" or "ccw" for clockwise or counterclockwise
         """
         if stir_direction == "cw":
-            self.send_message("{0}1".format(self.SET_DIRECTION))
+            self.send_message(f"{self.SET_DIRECTION}1")
         elif stir_direction == "ccw":
-            self.send_message("{0}2".format(self.SET_DIRECTION))
+            self.send_message(f"{self.SET_DIRECTION}2")
         else:
             raise ValueError("ERROR: Supplied direction string is invalid: \"{0}\"".format(stir_direction))
 
@@ -19,22 +19,201 @@ For style guide used see http://xkcd.com/1513/
 
 # system imports
 import serial
-import os
-import sys
-import inspect
 from time import sleep
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
-
 # additional module imports
-from SerialDevice.serial_labware import SerialDevice, command
+from ..SerialDevice.serial_labware import SerialDevice, command
+
+
+def parse_answer(answer, value_type=float):
+    """
+    Converts the stripped answer of the chiller to a number. The answers are plain numbers (e.g. "21.35" or "1"), so
+    they are converted directly rather than matched against a regex, which also accepts anything float() does.
+
+    Args:
+        answer (str): The stripped answer string
+        value_type (type): (optional) The type the answer is converted to. Default: float
+
+    Returns:
+        value: The converted answer
+
+    Raises:
+        ValueError: The answer isn't a valid number
+    """
+    try:
+        return value_type(answer)
+    except (TypeError, ValueError):
+        raise ValueError("Value Error. Serial device did not return a valid answer. Received: \"{0}\".".format(answer))
 
 
 class JULABOCF41(SerialDevice):
     """
     This provides a python class for the JULABO CF41 chiller
     """
+
+    # DOCUMENTED COMMANDS for easier maintenance
+    OUT_MODE_01 = "OUT_MODE_01"
+    # Use working temperature
+    # Parameter 0, >Setpoint1<
+    # Parameter 1, >Setpoint2<
+    # Parameter 2, >Setpoint3<
+
+    OUT_MODE_02 = "OUT_MODE_02"
+    # parameter = 0, Selftuning „off“.
+    # Temperature control by using the stored parameters.
+    # parameter = 1, Selftuning „once“ Single selftuning of
+    # controlled system after the next start.
+    # parameter = 2, Selftuning „always“ Continual selftuning
+    # of controlled system whenever a new setpoint is to be reached.
+
+    OUT_MODE_03 = "OUT_MODE_03"
+    # parameter = 0, Set external programmer input to voltage.
+    # Voltage 0 V ... 10 V
+    # parameter = 1, Set external programmer input to current.
+    # Current 0 mA ... 20 mA
+
+    OUT_MODE_04 = "OUT_MODE_04"
+    # parmaeter = 0, Temperature control of internal bath.
+    # parameter = 1, External control with Pt100 sensor.
+
+    OUT_MODE_05 = "OUT_MODE_05"
+    # parameter = 0, Stop the unit = R –OFF-.
+    # parameter = 1, Start the unit.
+
+    OUT_MODE_08 = "OUT_MODE_08"
+    # parameter = 0, Set the control dynamics - aperiodic
+    # parameter = 1, Set the control dynamics - standard
+
+    OUT_SP_00 = "OUT_SP_00"
+    # parameter = xxx.xx, Set working temperature. „Setpoint 1“
+
+    OUT_SP_01 = "OUT_SP_01"
+    # parameter = xxx.xx, Set working temperature. „Setpoint 2“
+
+    OUT_SP_02 = "OUT_SP_02"
+    # parameter = xxx.xx, Set working temperature. „Setpoint 3“
+
+    OUT_SP_03 = "OUT_SP_03"
+    # parameter = xxx.xx, Set high temperature warning limit „OverTemp“
+
+    OUT_SP_04 = "OUT_SP_04"
+    # parameter = xxx.xx, Set low temperature warning limit „SubTemp“
+
+    OUT_SP_07 = "OUT_SP_07"
+    # parameter = 1..4, Set the pump pressure stage.
+
+    OUT_HIL_00 = "OUT_HIL_00"
+    # parameter = -xxx, Set the desired maximum cooling power (0 % to 100 %).
+    # Note: Enter the value with a preceding negative sign!
+    # This command only valid with the CF41.
+
+    OUT_HIL_01 = "OUT_HIL_01"
+    # parameter = xxx, Set the desired maximum
+    # heating power (10 % to 100 %).
+
+    VERSION = "VERSION"
+    # parameter = None, Number of software version (V X.xx)
+
+    STATUS = "STATUS"
+    # paramter = None, Status message, error message (see page 75)
+
+    IN_PV_00 = "IN_PV_00"
+    # paramter = None, Actual bath temperature.
+
+    IN_PV_01 = "IN_PV_01"
+    # parameter = None, Heating power being used (%).
+
+    IN_PV_02 = "IN_PV_02"
+    # parameter = None, Temperature value registered by the external Pt100 sensor.
+
+    IN_PV_03 = "IN_PV_03"
+    # parameter = None, Temperature value registered by the safety sensor.
+
+    IN_PV_04 = "IN_PV_04"
+    # parameter = None, Setpoint temperature („SafeTemp“)
+    # of the excess temperature protection
+
+    IN_SP_00 = "IN_SP_00"
+    # parameter = None, Working temperature „Setpoint 1“
+
+    IN_SP_01 = "IN_SP_01"
+    # parameter = None, Working temperature „Setpoint 2“
+
+    IN_SP_02 = "IN_SP_02"
+    # parameter = None, Working temperature „Setpoint 3“
+
+    IN_SP_03 = "IN_SP_03"
+    # parameter = None, High temperature warning limit „OverTemp“
+
+    IN_SP_04 = "IN_SP_04"
+    # parameter = None, Low temperature warning limit „SubTemp“
+
+    IN_MODE_01 = "IN_MODE_01"
+    # parameter = None, Selected setpoint:0 = Setpoint 1
+    # 1 = Setpoint 2 2 = Setpoint 3
+
+    IN_MODE_02 = "IN_MODE_02"
+    # parameter = None, Selftuning type: 0 = Selftuning „off“
+    # 1 = Selftuning „once“, 2 = Selftuning „alway“
+
+    IN_MODE_03 = "IN_MODE_03"
+    # parameter = None, Type of the external programmer input:
+    # 0 = Voltage 0 V to 10 V, 1 = Current 0 mA to 20 mA
+
+    IN_MODE_04 = "IN_MODE_04"
+    # parameter = None, Internal/external temperature control:
+    # 0 = Temperature control with internal sensor.
+    # 1 = Temperature control with external Pt100 sensor.
+
+    IN_MODE_05 = "IN_MODE_05"
+    # parameter = None, Cryo-Compact Circulator in Stop/Start condition:
+    # 0 = Stop, 1 = Start
+
+    IN_MODE_08 = "IN_MODE_08"
+    # parameter = None, Adjusted control dynamics
+    # 0 = aperiodic, 1 = standard
+
+    IN_HIL_00 = "IN_HIL_00"
+    # parameter = None, Max. cooling power (%).
+
+    IN_HIL_01 = "IN_HIL_01"
+    # parameter = None,  Max. heating power (%).
+
+    # setpoint commands, indexed by the setpoint number as used by OUT_MODE_01 and IN_MODE_01
+    SP_WRITE = (OUT_SP_00, OUT_SP_01, OUT_SP_02)
+    SP_READ = (IN_SP_00, IN_SP_01, IN_SP_02)
+
+    # status and error messages keyed by their code, value is the short name and a description
+    STATUS_MESSAGES = {
+        0: ('MANUAL STOP', 'Cryo-Compact Circulator in „OFF“ state.'),
+        1: ('MANUAL START', 'Cryo-Compact Circulator in keypad control mode.'),
+        2: ('REMOTE STOP', 'Cryo-Compact Circulator in „r OFF“ state.'),
+        3: ('REMOTE START', 'Cryo-Compact Circulator in remote control mode.'),
+    }
+
+    ERROR_MESSAGES = {
+        -1: ('LOW LEVEL ALARM', 'Low liquid level alarm'),
+        -3: ('EXCESS TEMPERATURE WARNING', 'High temperature warning'),
+        -4: ('LOW TEMPERATURE WARNING', 'Low temperature warning.'),
+        -5: ('WORKING SENSOR ALARM', 'Working temperature sensor short-circuited or interrupted.'),
+        -6: ('SENSOR DIFFERENCE ALARM', 'Sensor difference alarm. Working temperature and safety sensors report a temperature difference of more than 35 K.'),
+        -7: ('I2C-BUS ERROR', 'Internal error when reading or writing the I2C bus.'),
+        -8: ('INVALID COMMAND', 'Invalid command.'),
+        -9: ('COMMAND NOT ALLOWED IN CURRENT OPERATING MODE', 'Invalid command in current operating mode.'),
+        -10: ('VALUE TOO SMALL', 'Entered value too small.'),
+        -11: ('VALUE TOO LARGE', 'Entered value too large.'),
+        -12: ('TEMPERATURE MEASUREMENT ALARM', 'Error in A/D converter.'),
+        -13: ('WARNING : VALUE EXCEEDS TEMPERATURE LIMITS', 'Value lies outside the adjusted range for the high and low temperature warning limits. But value is stored.'),
+        -14: ('EXCESS TEMPERATURE PROTECTOR ALARM', 'Excess temperature protector alarm'),
+        -15: ('EXTERNAL SENSOR ALARM', 'External control selected, but external Pt100 sensor not connected.'),
+        -20: ('WARNING: CLEAN CONDENSOR OR CHECK COOLING WATER CIRCUIT OF REFRIGERATOR', 'Cooling of the condenser is affected. Clean air-cooled condenser. Check the flow rate and cooling water temperature on water-cooled condenser.'),
+        -21: ('WARNING: COMPRESSOR STAGE 1 DOES NOT WORK', 'Compressor stage 1 does not work.'),
+        -26: ('WARNING: STAND-BY PLUG IS MISSING', 'External standby contact is open. (see page 57and 70)'),
+        -33: ('SAFETY SENSOR ALARM', 'Excess temperature sensor short-circuited or interrupted.'),
+        -38: ('EXTERNAL SENSOR SETPOINT PROGRAMMING ALARM', 'Ext. Pt100 sensor input without signal and setpoint programming set to external Pt100.'),
+        -40: ('NIVEAU LEVEL WARNUNG', 'Low liquid level warning in the internal reservoir.'),
+    }
+
     def __init__(self, port=None, device_name=None, connect_on_instantiation=False, soft_fail_for_testing=False):
         """
         Initializer of the JULABOCF41 class
@@ -58,167 +237,8 @@ class JULABOCF41(SerialDevice):
         self.write_delay = 0.25
         self.read_delay = 0.1
 
-        # answer patterns
-        # TODO: compile a few
-
-        # DOCUMENTED COMMANDS for easier maintenance
-
-        self.OUT_MODE_01 = "OUT_MODE_01"
-        # Use working temperature   
-        # Parameter 0, >Setpoint1<
-        # Parameter 1, >Setpoint2<
-        # Parameter 2, >Setpoint3<
-
-        self.OUT_MODE_02 = "OUT_MODE_02"
-        # parameter = 0, Selftuning „off“.
-        # Temperature control by using the stored parameters.
-        # parameter = 1, Selftuning „once“ Single selftuning of
-        # controlled system after the next start.
-        # parameter = 2, Selftuning „always“ Continual selftuning
-        # of controlled system whenever a new setpoint is to be reached.
-
-        self.OUT_MODE_03 = "OUT_MODE_03"
-        # parameter = 0, Set external programmer input to voltage.
-        # Voltage 0 V ... 10 V
-        # parameter = 1, Set external programmer input to current.
-        # Current 0 mA ... 20 mA
-
-        self.OUT_MODE_04 = "OUT_MODE_04"
-        # parmaeter = 0, Temperature control of internal bath.
-        # parameter = 1, External control with Pt100 sensor.
-
-        self.OUT_MODE_05 = "OUT_MODE_05"
-        # parameter = 0, Stop the unit = R –OFF-.
-        # parameter = 1, Start the unit.
-
-        self.OUT_MODE_08 = "OUT_MODE_08"
-        # parameter = 0, Set the control dynamics - aperiodic
-        # parameter = 1, Set the control dynamics - standard
-
-        self.OUT_SP_00 = "OUT_SP_00"
-        # parameter = xxx.xx, Set working temperature. „Setpoint 1“
-        
-        self.OUT_SP_01 = "OUT_SP_01"
-        # parameter = xxx.xx, Set working temperature. „Setpoint 2“
-        
-        self.OUT_SP_02 = "OUT_SP_02"
-        # parameter = xxx.xx, Set working temperature. „Setpoint 3“
-        
-        self.OUT_SP_03 = "OUT_SP_03"
-        # parameter = xxx.xx, Set high temperature warning limit „OverTemp“
-        
-        self.OUT_SP_04 = "OUT_SP_04"
-        # parameter = xxx.xx, Set low temperature warning limit „SubTemp“
-
-        self.OUT_SP_07 = "OUT_SP_07"
-        # parameter = 1..4, Set the pump pressure stage.
-
-        self.OUT_HIL_00 = "OUT_HIL_00"
-        # parameter = -xxx, Set the desired maximum cooling power (0 % to 100 %).
-        # Note: Enter the value with a preceding negative sign!
-        # This command only valid with the CF41.
-
-        self.OUT_HIL_01 = "OUT_HIL_01"
-        # parameter = xxx, Set the desired maximum
-        # heating power (10 % to 100 %).
-
-        self.VERSION = "VERSION"
-        # parameter = None, Number of software version (V X.xx)
-
-        self.STATUS = "STATUS"
-        # paramter = None, Status message, error message (see page 75)
-
-        self.IN_PV_00 = "IN_PV_00"
-        # paramter = None, Actual bath temperature.
-
-        self.IN_PV_01 = "IN_PV_01"
-        # parameter = None, Heating power being used (%).
-        
-        self.IN_PV_02 = "IN_PV_02"
-        # parameter = None, Temperature value registered by the external Pt100 sensor.
-        
-        self.IN_PV_03 = "IN_PV_03"
-        # parameter = None, Temperature value registered by the safety sensor.
-
-        self.IN_PV_04 = "IN_PV_04"
-        # parameter = None, Setpoint temperature („SafeTemp“)
-        # of the excess temperature protection
-
-        self.IN_SP_00 = "IN_SP_00"
-        # parameter = None, Working temperature „Setpoint 1“
-
-        self.IN_SP_01 = "IN_SP_01"
-        # parameter = None, Working temperature „Setpoint 2“
-
-        self.IN_SP_02 = "IN_SP_02"
-        # parameter = None, Working temperature „Setpoint 3“
-
-        self.IN_SP_03 = "IN_SP_03"
-        # parameter = None, High temperature warning limit „OverTemp“
-
-        self.IN_SP_04 = "IN_SP_04"
-        # parameter = None, Low temperature warning limit „SubTemp“
-
-        self.IN_MODE_01 = "IN_MODE_01"
-        # parameter = None, Selected setpoint:0 = Setpoint 1
-        # 1 = Setpoint 2 2 = Setpoint 3
-
-        self.IN_MODE_02 = "IN_MODE_02"
-        # parameter = None, Selftuning type: 0 = Selftuning „off“
-        # 1 = Selftuning „once“, 2 = Selftuning „alway“
-
-        self.IN_MODE_03 = "IN_MODE_03"
-        # parameter = None, Type of the external programmer input:
-        # 0 = Voltage 0 V to 10 V, 1 = Current 0 mA to 20 mA
-
-        self.IN_MODE_04 = "IN_MODE_04"
-        # parameter = None, Internal/external temperature control:
-        # 0 = Temperature control with internal sensor.
-        # 1 = Temperature control with external Pt100 sensor.
-
-        self.IN_MODE_05 = "IN_MODE_05"
-        # parameter = None, Cryo-Compact Circulator in Stop/Start condition:
-        # 0 = Stop, 1 = Start
-
-        self.IN_MODE_08 = "IN_MODE_08"
-        # parameter = None, Adjusted control dynamics
-        # 0 = aperiodic, 1 = standard
-
-        self.IN_HIL_00 = "IN_HIL_00"
-        # parameter = None, Max. cooling power (%).
-
-        self.IN_HIL_01 = "IN_HIL_01"
-        # parameter = None,  Max. heating power (%).
-
-        self.status_messages = {
-            '00 MANUAL STOP': 'Cryo-Compact Circulator in „OFF“ state.',
-            '01 MANUAL START': 'Cryo-Compact Circulator in keypad control mode.',
-            '02 REMOTE STOP': 'Cryo-Compact Circulator in „r OFF“ state.',
-            '03 REMOTE START': 'Cryo-Compact Circulator in remote control mode.',
-        }
-
-        self.error_messages = {
-            '-01 LOW LEVEL ALARM': 'Low liquid level alarm',
-            '-03 EXCESS TEMPERATURE WARNING': 'High temperature warning',
-            '-04 LOW TEMPERATURE WARNING': 'Low temperature warning.',
-            '-05 WORKING SENSOR ALARM': 'Working temperature sensor short-circuited or interrupted.',
-            '-06 SENSOR DIFFERENCE ALARM': 'Sensor difference alarm. Working temperature and safety sensors report a temperature difference of more than 35 K.',
-            '-07 I2C-BUS ERROR': 'Internal error when reading or writing the I2C bus.',
-            '-08 INVALID COMMAND': 'Invalid command.',
-            '-09 COMMAND NOT ALLOWED IN CURRENT OPERATING MODE': 'Invalid command in current operating mode.',
-            '-10 VALUE TOO SMALL': 'Entered value too small.',
-            '-11 VALUE TOO LARGE': 'Entered value too large.',
-            '-12 TEMPERATURE MEASUREMENT ALARM': 'Error in A/D converter.',
-            '-13 WARNING : VALUE EXCEEDS TEMPERATURE LIMITS': 'Value lies outside the adjusted range for the high and low temperature warning limits. But value is stored.',
-            '-14 EXCESS TEMPERATURE PROTECTOR ALARM': 'Excess temperature protector alarm',
-            '-15 EXTERNAL SENSOR ALARM': 'External control selected, but external Pt100 sensor not connected.',
-            '-20 WARNING: CLEAN CONDENSOR OR CHECK COOLING WATER CIRCUIT OF REFRIGERATOR': 'Cooling of the condenser is affected. Clean air-cooled condenser. Check the flow rate and cooling water temperature on water-cooled condenser.',
-            '-21 WARNING: COMPRESSOR STAGE 1 DOES NOT WORK': 'Compressor stage 1 does not work.',
-            '-26 WARNING: STAND-BY PLUG IS MISSING': 'External standby contact is open. (see page 57and 70)',
-            '-33 SAFETY SENSOR ALARM': 'Excess temperature sensor short-circuited or interrupted.',
-            '-38 EXTERNAL SENSOR SETPOINT PROGRAMMING ALARM': 'Ext. Pt100 sensor input without signal and setpoint programming set to external Pt100.',
-            '-40 NIVEAU LEVEL WARNUNG': 'Low liquid level warning in the internal reservoir.',
-        }
+        # index of the setpoint in use, once known. only changes through set_temperature unless the keypad is used
+        self.active_setpoint = None
 
         self.launch_command_handler()
 
@@ -234,18 +254,15 @@ class JULABOCF41(SerialDevice):
             temp (float): Temperature setpoint
             setpoint (int): Which of the three distinct setpoints (0..2) is to be set
         """
+        if not 0 <= setpoint < len(self.SP_WRITE):
+            raise ValueError('The set point should be in range 0..{}'.format(len(self.SP_WRITE) - 1))
+
         # setting the setpoint
-        if setpoint == 0:
-            self.send_message('{} {}'.format(self.OUT_SP_00, round(temp, 2)), False)
-        elif setpoint == 1:
-            self.send_message('{} {}'.format(self.OUT_SP_01, round(temp, 2)), False)
-        elif setpoint == 2:
-            self.send_message('{} {}'.format(self.OUT_SP_02, round(temp, 2)), False)
-        else:
-            raise ValueError('The set point should be in range 0..2')
-            
-        # Using working from set point
-        self.send_message('{} {}'.format(self.OUT_MODE_01, setpoint), False)
+        self.send_message(f'{self.SP_WRITE[setpoint]} {round(temp, 2)}', False)
+
+        # Using working from set point. sent separately, the chiller needs the write delay between two commands
+        self.send_message(f'{self.OUT_MODE_01} {setpoint}', False)
+        self.active_setpoint = setpoint
 
     @command
     def set_cooling_power(self, cooling_power=100):
@@ -262,40 +279,65 @@ class JULABOCF41(SerialDevice):
             cooling_power = -cooling_power
 
         # Using working from set point
-        self.send_message('{} {}'.format(self.OUT_HIL_00, cooling_power), False)
+        self.send_message(f'{self.OUT_HIL_00} {cooling_power}', False)
 
     @command
     def start(self):
         """Starts the chiller"""
-        self.send_message('{} {}'.format(self.OUT_MODE_05, 1), False)
+        self.send_message(f'{self.OUT_MODE_05} 1', False)
 
     @command
     def stop(self):
         """Stops the chiller"""
-        self.send_message('{} {}'.format(self.OUT_MODE_05, 0), False)
+        self.send_message(f'{self.OUT_MODE_05} 0', False)
 
     @command
     def get_temperature(self):
         """Reads the current temperature of the bath"""
-        return float(self.send_message(self.IN_PV_00, True))
+        return parse_answer(self.send_message(self.IN_PV_00, True))
 
     @command
     def get_setpoint(self):
-        """Reads the current temperature setpoint"""
-        setpoint_used = self.send_message(self.IN_MODE_01, True)  # check which of the three setpoints is in use
-        if setpoint_used == "0":
-            return float(self.send_message(self.IN_SP_00, True))
-        elif setpoint_used == "1":
-            return float(self.send_message(self.IN_SP_01, True))
-        elif setpoint_used == "2":
-            return float(self.send_message(self.IN_SP_02, True))
-        else:
-            self.logger.critical("ERROR! Setpoint query returned {0} which is not a recognised setpoint!".format(setpoint_used))
+        """
+        Reads the current temperature setpoint. The chiller is only asked which of the setpoints is in use if that isn't
+        known yet, see invalidate_setpoint_cache.
+        """
+        if self.active_setpoint is None:
+            # check which of the three setpoints is in use
+            setpoint_used = parse_answer(self.send_message(self.IN_MODE_01, True), int)
+            if 0 <= setpoint_used < len(self.SP_READ):
+                self.active_setpoint = setpoint_used
+            else:
+                self.logger.critical("ERROR! Setpoint query returned {0} which is not a recognised setpoint!".format(setpoint_used))
+                return None
+        return parse_answer(self.send_message(self.SP_READ[self.active_setpoint], True))
+
+    def invalidate_setpoint_cache(self):
+        """
+        Forgets which setpoint is in use, so the next get_setpoint asks the chiller again. Call this after the setpoint
+        was switched on the keypad.
+        """
+        self.active_setpoint = None
 
     @command
     def get_status(self):
         """ Returns the status of the chiller"""
         status = self.send_message(self.STATUS, True)
+        if not isinstance(status, str):
+            # no connection, nothing to look up
+            return status
+        # the status starts with its code, e.g. "03 REMOTE START"
+        try:
+            code = int(status.partition(" ")[0])
+        except ValueError:
+            self.logger.critical("Chiller returned an unparseable status: \"%s\"", status)
+            return status
+        if code < 0:
+            name, description = self.ERROR_MESSAGES.get(code, (status, "Unknown error."))
+            self.logger.critical("Chiller error %s %s: %s", code, name, description)
+        else:
+            name, description = self.STATUS_MESSAGES.get(code, (status, "Unknown status."))
+            self.logger.debug("Chiller status %s %s: %s", code, name, description)
         return status
 
 
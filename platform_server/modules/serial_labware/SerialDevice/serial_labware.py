@@ -24,39 +24,91 @@ For style guide used see http://xkcd.com/1513/
 import platform
 import threading
 import re
+from collections import deque
 from queue import Queue
-from functools import wraps
-from time import time, sleep
+from functools import lru_cache, partial, wraps
+from time import monotonic, time, sleep
 
 # additional module imports
 import serial
 import logging
 
 
-def command(func):
+def command(func=None, sync=False):
     """
     Decorator for command_set execution. Checks if the method is called in the same thread as the class instance,
     if so enqueues the command_set and waits for a reply in the reply queue. Else it concludes it must be the command
     handler thread and actually executes the method. This way methods in the child classes need to be written
     just once and decorated accordingly.
+    Pure queries can be decorated with @command(sync=True) instead. They are executed directly in the calling thread,
+    holding the port lock so they can't interleave with anything the command handler is sending, which saves the
+    round trip through the queues and the handler thread.
+    :param bool sync: execute the method in the calling thread rather than in the command handler
     :return: decorated method
     """
+    if func is None:
+        return partial(command, sync=sync)
 
     @wraps(func)
     def wrapper(*args, **kwargs):
         device_instance = args[0]
-        if threading.get_ident() == device_instance.current_thread:
+        if sync:
+            with device_instance.port_lock:
+                return func(*args, **kwargs)
+        elif threading.get_ident() == device_instance.current_thread:
             command_set = [func, args, kwargs]
-            device_instance.command_queue.put(command_set)
-            while True:
-                if not device_instance.reply_queue.empty():
-                    return device_instance.reply_queue.get()
+            device_instance.command_queue.append(command_set)
+            device_instance.command_ready.set()
+            # blocks until the command handler has put the reply
+            return device_instance.reply_queue.get()
         else:
             return func(*args, **kwargs)
 
     return wrapper
 
 
+# type of compiled regular expressions (_sre.SRE_Pattern up to Python 3.6, re.Pattern afterwards)
+PATTERN_TYPE = type(re.compile(""))
+
+# syntax of a returned answer unless a child class overrides it: any number of any character, in one group
+ANSWER_PATTERN = re.compile(r"(.*)")
+
+
+def encode_message(message, command_termination, standard_encoding):
+    """
+    Terminates and encodes a message for sending. Most messages are constant commands sent over and over again, so
+    encoded strings and bytes are cached. Anything else is converted to a string and encoded without caching, since
+    e.g. True and 1 or 5.0 and 5 would share a cache entry.
+    :param message: The message, either as string or as bytes
+    :param str command_termination: The termination appended to the message
+    :param str standard_encoding: The encoding of the device
+    :return: the encoded message
+    """
+    if isinstance(message, (str, bytes)):
+        return _encode_cached(message, command_termination, standard_encoding)
+    return _encode(message, command_termination, standard_encoding)
+
+
+def _encode(message, command_termination, standard_encoding):
+    # messages that are already bytes are passed on as they are, just terminated
+    if isinstance(message, bytes):
+        return message + command_termination.encode(standard_encoding)
+    return f"{message}{command_termination}".encode(standard_encoding)
+
+
+_encode_cached = lru_cache(maxsize=256, typed=True)(_encode)
+
+
+def wait_until(deadline):
+    """
+    Sleeps until the given point in time, if it hasn't passed already.
+    :param float deadline: The point in time as returned by time.monotonic()
+    """
+    remaining = deadline - monotonic()
+    if remaining > 0:
+        sleep(remaining)
+
+
 class SerialDevice:
     """
     This is a generic parent class handling serial communication with lab equipment. It provides
@@ -78,8 +130,12 @@ class SerialDevice:
         # implement class logger
         self.logger = logging.getLogger("main_logger.serial_device_logger")
         # spawn queues
-        self.command_queue = Queue()
+        # deque operations are atomic, the event wakes up the command handler when a command is appended
+        self.command_queue = deque()
+        self.command_ready = threading.Event()
         self.reply_queue = Queue()
+        # held by the command handler while it talks to the device, and by queries executed outside of it
+        self.port_lock = threading.RLock()
         # DEBUG testing switch, to allow soft-fails instead of exceptions
         self.__soft_fail_for_testing = soft_fail_for_testing
         # check if the port passed is of the correct format
@@ -111,7 +167,7 @@ class SerialDevice:
         self.device_name = device_name
 
         # syntax of a returned answer, to be overridden by child classes
-        self.answer_pattern = re.compile("(.*)")  # any number of any character, in one group
+        self.answer_pattern = ANSWER_PATTERN
 
         # initialise last time (for non blocking wait
         self.last_time = time()
@@ -131,9 +187,15 @@ class SerialDevice:
         self.write_timeout = None
         self.dsrdtr = False
         self.inter_byte_timeout = None
+        self.low_latency = False  # ask the driver to hand over received bytes immediately (Linux only)
 
         self.write_delay = 0  # delay in seconds before sending a command
         self.read_delay = 0  # delay in seconds after sending a command
+        # earliest (monotonic) times for the next write and read. the delays are only waited out as far as they haven't
+        # passed already, e.g. while the device sat idle
+        self.__next_write = 0
+        self.__next_read = 0
+        self.keepalive_interval = 1  # seconds between keepalive calls while idle, unless the keepalive says otherwise
 
     def __command_handler_daemon(self):
         """
@@ -144,27 +206,37 @@ class SerialDevice:
 
         This private function polls the command_queue for any commands to send. If no commands are queued,
         a keepalive method is executed. Any replies received from the device are enqueued into reply_queue for
-        further processing.
+        further processing. Between keepalive calls the thread waits for a new command instead of polling the
+        command_queue, for as long as the keepalive reports it is until it is next due, or keepalive_interval if it
+        doesn't say.
         """
+        keepalive_wait = 0  # seconds until the next keepalive is due, as reported by the last keepalive call
         while True:
             try:
-                if not self.command_queue.empty():
-                    command_item = self.command_queue.get()
-                    method = command_item[0]
-                    arguments = command_item[1]
-                    keywordarguments = command_item[2]
+                if not self.command_queue:
+                    # clear the flag before looking again, a command appended after this point sets it again
+                    self.command_ready.clear()
+                    if not self.command_queue and not self.command_ready.wait(keepalive_wait or 0):
+                        with self.port_lock:
+                            keepalive_wait = self.keepalive()
+                        if keepalive_wait is None:
+                            keepalive_wait = self.keepalive_interval
+                        continue
+                command_item = self.command_queue.popleft()
+                method = command_item[0]
+                arguments = command_item[1]
+                keywordarguments = command_item[2]
+                with self.port_lock:
                     reply = method(*arguments, **keywordarguments)
-                    self.reply_queue.put(reply)
-                else:
-                    self.keepalive()
+                self.reply_queue.put(reply)
+                keepalive_wait = 0  # let the keepalive check whether it became due while the command ran
             except ValueError as e:
                 # workaround if something goes wrong with the serial connection
                 # future me will certainly not hate past me for this...
                 self.logger.critical(e)
                 self.__connection.flush()
                 # thread-safe purging of both queues
-                while not self.command_queue.empty():
-                    self.command_queue.get()
+                self.command_queue.clear()
                 while not self.reply_queue.empty():
                     self.reply_queue.get()
 
@@ -197,6 +269,14 @@ class SerialDevice:
                 dsrdtr=self.dsrdtr,
                 inter_byte_timeout=self.inter_byte_timeout
             )
+            if self.low_latency:
+                try:
+                    self.__connection.set_low_latency_mode(True)
+                except (AttributeError, ValueError, OSError) as e:
+                    # not available on this platform or for this adapter, the port works fine without it
+                    self.logger.debug("Low latency mode could not be enabled: {0}".format(e))
+            # give the freshly opened port the usual write delay before the first command
+            self.__next_write = monotonic() + self.write_delay
             return True  # announce success
         except (AttributeError, FileNotFoundError, serial.SerialException) as e:
             # allowing for soft fail in test modes, this will allow an outer script to continue, even if an
@@ -227,7 +307,8 @@ class SerialDevice:
         since they may vary wildly. Therefore such a check must be performed before calling send_message!
 
         Args:
-            message (str): The message string. No checks are performed on the message and it is just passed on
+            message (str or bytes): The message string. No checks are performed on the message and it is just passed
+                on. Messages that are already encoded are sent as they are, only the termination is appended
             get_return (bool): Are you expecting a return message?
             return_pattern (_sre.SRE_Pattern): Passes on a regex pattern to check the returned message against
             multiline (bool): Are you expecting a return message spanning multiple lines?
@@ -240,15 +321,12 @@ class SerialDevice:
             - returns -1 if send message fails
         """
         # send the message and encode it according to the standard settings found in __init__
-        # Hint: "{}".format(message) auto converts message to string in case it was something else, so no type checking
+        # Hint: the f-string in encode_message auto converts message to string in case it was something else, so no
+        # type checking
         if self.__connection is not None:
             try:
-                sleep(self.write_delay)
                 # self.__connection.flush()  # get rid of shite from the last transmission
-                self.__connection.write(
-                    "{0}{1}".format(message, self.command_termination).encode(self.standard_encoding)
-                )
-                sleep(self.read_delay)
+                self.__write(encode_message(message, self.command_termination, self.standard_encoding))
             except Exception as e:
                 if not self.__soft_fail_for_testing:
                     # just raise the exception again when not in test mode
@@ -267,6 +345,65 @@ class SerialDevice:
             self.logger.debug("Could not send message: no connection to serial device established.")
             return -1
 
+    def send_messages(self, messages, get_return=False, return_pattern=None, answer_count=None):
+        """
+        Method for sending several messages to the device in one go. The messages are joined into a single write, so
+        the write and read delays are only waited for once, and the answers are read back afterwards, one line per
+        message. The same caveats as for send_message apply.
+
+        Args:
+            messages (iterable of str or bytes): The message strings, in the order they should be sent
+            get_return (bool): Are you expecting return messages?
+            return_pattern (_sre.SRE_Pattern): Passes on a regex pattern to check each returned message against
+            answer_count (int): (optional) Number of answer lines to read, if some of the messages don't get an answer.
+                Default: one per message
+
+        Returns:
+            (conditional)
+            - returns "True" if no messages are expected back
+            - returns a list with the result of "__receive_message" for each message
+            - returns -1 if send message fails
+        """
+        messages = list(messages)
+        if self.__connection is not None:
+            try:
+                self.__write(
+                    b"".join(
+                        encode_message(message, self.command_termination, self.standard_encoding)
+                        for message in messages
+                    )
+                )
+            except Exception as e:
+                if not self.__soft_fail_for_testing:
+                    # just raise the exception again when not in test mode
+                    raise
+                else:
+                    self.logger.debug("Error: Unexpected error while writing to serial. Error Message: {0}".format(e))
+
+            if get_return:
+                if answer_count is None:
+                    answer_count = len(messages)  # one answer line per message sent
+                return [self.__receive_message(return_pattern=return_pattern) for _ in range(answer_count)]
+            else:
+                return True
+        else:
+            self.logger.debug("Could not send messages: no connection to serial device established.")
+            return -1
+
+    def __write(self, data):
+        """
+        Writes the encoded data to the device, keeping to write_delay and read_delay. The write waits for whatever is
+        left of the write delay since the last exchange with the device, and the next read for the read delay after
+        this write. If nothing is read back, the read delay is added to the wait before the next write instead.
+
+        Args:
+            data (bytes): The encoded and terminated message(s)
+        """
+        wait_until(self.__next_write)
+        self.__connection.write(data)
+        self.__next_read = monotonic() + self.read_delay
+        self.__next_write = self.__next_read + self.write_delay
+
     def __receive_message(self, return_pattern=None, multiline=False):
         """
         Protected member function that is the sole responsible for actually receiving messages from the device.
@@ -287,6 +424,7 @@ class SerialDevice:
         try:
             # checking if a connection is there
             if self.__connection is not None:
+                wait_until(self.__next_read)
                 # if multiple lines are expected, keep reading lines until no more lines come in
                 if multiline:
                     answer = ""
@@ -302,16 +440,20 @@ class SerialDevice:
                     # decoding the answer using the standard settings from __init__
                     answer = answer.decode(self.standard_encoding)
 
+                self.__next_write = monotonic() + self.write_delay
+
                 # if the user wants a code check performed
                 if return_pattern is not None:
-                    if type(return_pattern).__name__ != "SRE_Pattern":
+                    if not isinstance(return_pattern, PATTERN_TYPE):
                         raise ValueError(
                             "The return code you specified was not a valid regular expression: {0}".format(return_pattern)
                         )
 
-                    if re.fullmatch(pattern=return_pattern, string=answer):
+                    # a single anchored walk both checks the answer and captures the groups
+                    match = return_pattern.fullmatch(answer)
+                    if match:
                         # if the answer matches the desired pattern return the read value
-                        return re.match(pattern=return_pattern, string=answer).groups()
+                        return match.groups()
                     else:
                         self.logger.critical(
                             "Value Error. Serial device did not return correct return code. Send: \"{0}\". "
@@ -352,6 +494,61 @@ class SerialDevice:
     def keepalive(self):
         """
         Dummy keepalive method. This is just a stand-in for whatever keepalive operation needs to be performed
-        on the device, meant to be overridden in the actual child class.
+        on the device, meant to be overridden in the actual child class. Child classes may return the number of
+        seconds until the keepalive is next due, the command handler then doesn't call it again before that unless
+        a command comes in. If nothing is returned, it is called again after keepalive_interval seconds.
         """
         pass
+
+
+def parse_value_answer(answer, value_type=float):
+    """
+    Picks apart a "<value> <type>" answer of the device (e.g. "35.2 1"). Those answers are simple enough to be split
+    directly instead of being matched against a regex.
+
+    Args:
+        answer (str): The stripped answer string
+        value_type (type): (optional) The type the value is converted to. Default: float
+
+    Returns:
+        value, reading_type (tuple): The converted value and the type of the reading as int
+
+    Raises:
+        ValueError: The answer doesn't have the expected format
+    """
+    value, _, reading_type = answer.partition(" ")
+    try:
+        return value_type(value), int(reading_type)
+    except ValueError:
+        raise ValueError("Value Error. Serial device did not return a valid answer. Received: \"{0}\".".format(answer))
+
+
+class IKASerialDevice(SerialDevice):
+    """
+    Common base class for the IKA devices. They all share the same serial settings and answer format, so those are
+    set up here once instead of in every driver. Their "<value> <type>" answers are parsed with parse_value_answer.
+    """
+
+    def __init__(self, port=None, device_name=None, soft_fail_for_testing=False):
+        """
+        Initializer of the IKASerialDevice class.
+
+        Args:
+            port (str): The port name/number of the device
+            device_name (str): A descriptive name for the device, used mainly in debug prints.
+            soft_fail_for_testing (bool): (optional) determines if an invalid serial port raises an error or merely logs
+                a message. Default: Off
+        """
+        super().__init__(port, device_name, soft_fail_for_testing)
+
+        # serial settings
+        self.baudrate = 9600
+        self.bytesize = serial.SEVENBITS
+        self.parity = serial.PARITY_EVEN
+
+        self.low_latency = True
+
+        # the answers are read with readline, which returns as soon as the line is complete, so there is no need to
+        # wait before reading. the write delay is kept to space out commands that don't get an answer
+        self.write_delay = 0.1
+        self.read_delay = 0
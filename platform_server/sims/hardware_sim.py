@@ -41,7 +41,7 @@ class SimChemputerPump(SimDevice):
     def move_to_home(self, speed_ul):
         self.logger.debug('Pump \"{0}\" - Moving home: Speed: {1}'.format(self.name, speed_ul))
 
-    def wait_until_ready(self):
+    def wait_until_ready(self, timeout=None):
         self.logger.debug('Pump \"{0}\" - Waiting until ready...'.format(self.name))
 
     
@@ -57,7 +57,7 @@ class SimChemputerValve(SimDevice):
     def move_to_position(self, position):
         self.logger.debug('Valve \"{0}\" - Moving to position {1}'.format(self.name, position))
         
-    def wait_until_ready(self):
+    def wait_until_ready(self, timeout=None):
         self.logger.debug('Valve \"{0}\" - Waiting until ready...'.format(self.name))
 
     
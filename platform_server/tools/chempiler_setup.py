@@ -19,7 +19,6 @@ This graph is populated with objects related to the platform e.g. Stirrer plates
 For style guide used see http://xkcd.com/1513/
 """
 
-import inspect
 import os
 import sys
 import time
@@ -27,8 +26,9 @@ import time
 import networkx as nx
 import serial
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
+HERE = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(HERE, '..') not in sys.path:
+    sys.path.append(os.path.join(HERE, '..'))
 
 """ Imports """
 # Import all modules available
@@ -24,11 +24,11 @@ import networkx as nx
 import logging
 import os
 import sys
-import inspect
 import time
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
+HERE = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(HERE, '..') not in sys.path:
+    sys.path.append(os.path.join(HERE, '..'))
 
 from tools.module_execution.pump_execution import PumpExecutioner
 from tools.module_execution.stirrer_execution import StirrerExecutioner
@@ -47,8 +47,9 @@ class Executioner(object):
     Args:
         graph (ChemOSGraph): Graph object representing the physical platform_server, populated with module objects
         simulation (bool): Whether or not this is a simulation
+        dirty_nodes (set): Optional set the names of nodes with changed volumes are added to
     """
-    def __init__(self, graph, simulation=False):
+    def __init__(self, graph, simulation=False, dirty_nodes=None):
         self.graph = graph
         self.simulation = simulation
         self.thread_pool = []
@@ -63,7 +64,7 @@ class Executioner(object):
         self.chiller = self.get_device_objects(CHILLER_FLAG)
 
         # Executors
-        self.pump_executor = PumpExecutioner(self.graph, self.pumps, self.valves, self.simulation)
+        self.pump_executor = PumpExecutioner(self.graph, self.pumps, self.valves, self.simulation, dirty_nodes)
         self.stirrer_executor = StirrerExecutioner(self.stirrers, self.simulation)
         self.rotavap_executor = RotavapExecutioner(self.rotavaps, self.simulation)
         self.vacuum_executor = VacuumExecutioner(self.vacuum, self.simulation)
@@ -20,12 +20,12 @@ For style guide used see http://xkcd.com/1513/
 
 import os
 import sys
-import inspect
 import logging
 from time import sleep
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, "..', '.."))
+HERE = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(HERE, '..', '..') not in sys.path:
+    sys.path.append(os.path.join(HERE, '..', '..'))
 
 from tools.constants import *
 
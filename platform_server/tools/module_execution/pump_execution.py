@@ -19,7 +19,6 @@ phase separation that are needed to operate the Chemputer rig.
 For style guide used see http://xkcd.com/1513/
 """
 
-import inspect
 import logging
 import os
 import sys
@@ -28,8 +27,9 @@ from time import sleep
 import networkx as nx
 
 # To get references to Chemputer pump and valve objects
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, "..', '.."))
+HERE = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(HERE, '..', '..') not in sys.path:
+    sys.path.append(os.path.join(HERE, '..', '..'))
 
 from modules.pv_api.Chemputer_Device_API import ChemputerPump, ChemputerValve
 from sims.hardware_sim import SimChemputerPump, SimChemputerValve
@@ -43,18 +43,20 @@ class PumpExecutioner(object):
     .. note:: Ignore the style faux pas of the simulation statements on a single line, it's better than taking up two
         lines for something that will rarely be used!
     """
-    def __init__(self, graph, pumps, valves, simulation):
+    def __init__(self, graph, pumps, valves, simulation, dirty_nodes=None):
         """
         Initialiser for the PumpExecutioner class.
         :param DiGraph graph: Graph representing the platform
         :param dict pumps: Dictionary contianing the pump names and their related objects
         :param dict valves: Dictionary containing the valve namaes and their related objects
         :param bool simulation: Whether or not this is a simulation
+        :param set dirty_nodes: (optional) set the names of nodes with changed volumes are added to
         """
         self.graph = graph  # For determining the correct pumps attached to the valves
         self.pumps = pumps
         self.valves = valves
         self.simulation = simulation
+        self.dirty_nodes = dirty_nodes if dirty_nodes is not None else set()
         self.logger = logging.getLogger("main_logger.pump_executioner_logger")
 
     def get_current_node_volume(self, node):
@@ -126,24 +128,30 @@ class PumpExecutioner(object):
             self.graph.node[source][CURRENT_VOLUME] = 0
         else:
             self.graph.node[source][CURRENT_VOLUME] -= volume
+        self.dirty_nodes.add(source)
 
         if self.graph.node[source].get(PARENT_FLASK, None) is not None:  # if the source is a "bottom" of something
             parent_flask = self.graph.node[source][PARENT_FLASK]
             self.graph.node[parent_flask][CURRENT_VOLUME] = self.graph.node[source][CURRENT_VOLUME]
+            self.dirty_nodes.add(parent_flask)
 
         elif self.graph.node[source].get(ASSOCIATED_FLASK, None) is not None:  # if the source is a "top" of something
             associated_flask = self.graph.node[source][ASSOCIATED_FLASK]
             self.graph.node[associated_flask][CURRENT_VOLUME] = self.graph.node[source][CURRENT_VOLUME]
+            self.dirty_nodes.add(associated_flask)
 
         # then deal with target node
         self.graph.node[target][CURRENT_VOLUME] += volume
+        self.dirty_nodes.add(target)
         if self.graph.node[target].get(PARENT_FLASK, None) is not None:  # if the target is a "bottom" of something
             parent_flask = self.graph.node[target][PARENT_FLASK]
             self.graph.node[parent_flask][CURRENT_VOLUME] += volume
+            self.dirty_nodes.add(parent_flask)
 
         elif self.graph.node[target].get(ASSOCIATED_FLASK, None) is not None:  # if the target is a "top" of something
             associated_flask = self.graph.node[target][ASSOCIATED_FLASK]
             self.graph.node[associated_flask][CURRENT_VOLUME] += volume
+            self.dirty_nodes.add(associated_flask)
 
     def is_valid_obj(self, flag, obj):
         """
@@ -18,7 +18,6 @@ COMMAND_LIST, and parameters.
 For style guide used see http://xkcd.com/1513/
 """
 
-import inspect
 import logging
 import os
 import sys
@@ -27,8 +26,9 @@ from copy import deepcopy
 # system imports
 import ply.yacc as yacc
 
-HERE = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
-sys.path.append(os.path.join(HERE, '..'))
+HERE = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(HERE, '..') not in sys.path:
+    sys.path.append(os.path.join(HERE, '..'))
 
 from tools.parsing.ChASM_lexer import tokens
 
@@ -20,6 +20,7 @@ For style guide used see http://xkcd.com/1513/
 import logging
 import time
 import multiprocessing
+from queue import Empty, Full
 import numpy as np
 import cv2
 
@@ -57,12 +58,20 @@ class VlogHandler(logging.Handler):
         Emit a record.
 
         If a formatter is specified, it is used to format the record.
-        The record is then put into the queue.
+        The record is then put into the queue. If the queue is full the oldest message is discarded, the recording
+        process only ever shows the most recent one anyway.
         """
         try:
             msg = self.format(record)
             # print("Logger {0} is enqueuing \"{1}\"".format(self.name, msg))
-            self.queue.put(msg)
+            try:
+                self.queue.put_nowait(msg)
+            except Full:
+                try:
+                    self.queue.get_nowait()
+                    self.queue.put_nowait(msg)
+                except (Empty, Full):
+                    pass  # lost the race against the recording process, never block the logging thread
 
         except Exception:
             self.handleError(record)